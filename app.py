@@ -1,8 +1,8 @@
 import streamlit as st
 import os
-import tempfile
 import glob
 import re
+import uuid
 from dotenv import load_dotenv
 
 st.set_page_config(page_title="Asystent kulinarny", layout="wide")
@@ -10,22 +10,42 @@ st.set_page_config(page_title="Asystent kulinarny", layout="wide")
 load_dotenv()
 
 try:
-    from recipe_data.recipe_data.fridge.fridge import Fridge
-    from recipe_data.recipe_data.shopping_list.shopping_list import ShoppingList
-    from recipe_data.recipe_data.tools.chatbot_with_tools import FridgeChatbot
+    from recipe_data.recipe_data.tools.common import get_user_lists
+    from recipe_data.recipe_data.list_blueprint.list_blueprint import USER_ID_RE
+    from recipe_data.recipe_data.tools.chatbot_with_tools import FridgeChatbot, warm_up
     from recipe_data.recipe_data.reader.photo_reader import PhotoReader
 except ImportError as e:
     st.error(f"Something went wrong with importing data {e}")
     st.stop()
 
+# Narzędzia RAG i executory budowane raz na proces, w tle
+@st.cache_resource
+def start_warm_up():
+    return warm_up()
+
+start_warm_up()
+
+# Klient OCR jest współdzielony przez wszystkie sesje
+@st.cache_resource
+def get_photo_reader():
+    return PhotoReader()
+
 # Inicjalizacja session_state tylko raz
 def init_session_state():
     if 'initialized' not in st.session_state:
         st.session_state.initialized = True
-        st.session_state.fridge = Fridge()
-        st.session_state.shopping_list = ShoppingList()
-        st.session_state.chatbot = FridgeChatbot()
-        st.session_state.photo_reader = PhotoReader()
+        # Użytkownik z adresu (?user=...); bez poprawnego parametru sesja dostaje własny identyfikator,
+        # zapisywany w adresie - odświeżenie strony i zakładka z tym adresem trafiają do tych samych list
+        user_id = st.query_params.get("user")
+        if not user_id or not USER_ID_RE.match(user_id):
+            user_id = uuid.uuid4().hex
+            st.query_params["user"] = user_id
+        st.session_state.user_id = user_id
+        fridge, shopping_list = get_user_lists(st.session_state.user_id)
+        st.session_state.fridge = fridge
+        st.session_state.shopping_list = shopping_list
+        st.session_state.chatbot = FridgeChatbot(fridge=fridge, shopping_list=shopping_list)
+        st.session_state.photo_reader = get_photo_reader()
         st.session_state.messages = []
         st.session_state.neo4j_settings = {'use_neo4j': False, 'rag_type': 'Graph RAG'}
         st.session_state.processing = False
@@ -71,7 +91,7 @@ def render_chatbot():
             st.rerun()
 
         st.subheader("Lodówka")
-        fridge_content = st.session_state.fridge.load_content()
+        fridge_content = st.session_state.fridge.refresh()
         if not fridge_content:
             st.info("Pusta")
         else:
@@ -82,7 +102,7 @@ def render_chatbot():
         st.divider()
         
         st.subheader("Lista Zakupów")
-        shopping_list_content = st.session_state.shopping_list.load_content()
+        shopping_list_content = st.session_state.shopping_list.refresh()
         if not shopping_list_content:
             st.info("Pusta")
         else:
@@ -111,18 +131,34 @@ def render_chatbot():
         
         if st.session_state.processing:
             with st.chat_message("assistant"):
-                with st.spinner("Myślę..."):
-                    try:
-                        response = st.session_state.chatbot.chat(st.session_state.messages[-1]["content"])
+                status = st.status("Myślę...", expanded=False)
+                final = {}
+
+                def answer_tokens():
+                    for event in st.session_state.chatbot.stream(st.session_state.messages[-1]["content"]):
+                        if event["type"] == "token":
+                            yield event["content"]
+                        elif event["type"] == "tool_start":
+                            status.update(label=f"Używam narzędzia: {event['name']}")
+                            status.write(f"{event['name']}: {event['input']}")
+                        elif event["type"] == "final":
+                            final["output"] = event["output"]
+
+                try:
+                    streamed = st.write_stream(answer_tokens())
+                    response = final.get("output") or streamed
+                    if not streamed:
                         st.markdown(response)
-                        st.session_state.messages.append({"role": "assistant", "content": response})
-                    except Exception as e:
-                        error_msg = f"Wystąpił błąd podczas komunikacji z chatbotem: {e}"
-                        st.error(error_msg)
-                        st.session_state.messages.append({"role": "assistant", "content": error_msg})
-                    finally:
-                        st.session_state.processing = False
-                        st.rerun()
+                    status.update(label="Gotowe", state="complete")
+                    st.session_state.messages.append({"role": "assistant", "content": response})
+                except Exception as e:
+                    error_msg = f"Wystąpił błąd podczas komunikacji z chatbotem: {e}"
+                    status.update(label="Błąd", state="error")
+                    st.error(error_msg)
+                    st.session_state.messages.append({"role": "assistant", "content": error_msg})
+                finally:
+                    st.session_state.processing = False
+                    st.rerun()
 
         if prompt := st.chat_input("W czym mogę pomóc?"):
             st.session_state.messages.append({"role": "user", "content": prompt})
@@ -136,7 +172,7 @@ def render_list_view(title, list_obj):
     
     with col1:
         st.subheader("Zawartość")
-        list_obj.content = list_obj.load_content()
+        list_obj.refresh()
         
         if not list_obj.content:
             st.info("Lista jest pusta.")
@@ -183,43 +219,22 @@ def render_list_view(title, list_obj):
 
         st.divider()
         st.subheader("Dodawanie ze zdjęcia")
-        uploaded_file = st.file_uploader("Wybierz zdjęcie listy", type=['jpg', 'jpeg', 'png'], key=f"uploader_{title}")
+        uploaded_files = st.file_uploader("Wybierz zdjęcia listy", type=['jpg', 'jpeg', 'png'], accept_multiple_files=True, key=f"uploader_{title}")
         
-        if uploaded_file is not None:
-            if st.button("Przetwórz zdjęcie", key=f"process_{title}"):
-                with st.spinner("Analizowanie zdjęcia..."):
+        if uploaded_files:
+            if st.button("Przetwórz zdjęcia", key=f"process_{title}"):
+                with st.spinner(f"Analizowanie zdjęć ({len(uploaded_files)})..."):
                     try:
-           
-                        with tempfile.NamedTemporaryFile(delete=False, suffix=f".{uploaded_file.name.split('.')[-1]}") as tmp_file:
-                            tmp_file.write(uploaded_file.getvalue())
-                            tmp_path = tmp_file.name
-                        
-             
-                        items = st.session_state.photo_reader.get_list_from_photo_path(tmp_path)
-                        
-          
-                        os.unlink(tmp_path)
-                        
-                        if isinstance(items, list):
-                            for item in items:
-                                list_obj.add_to_content(item)
-                            st.success(f"Dodano {len(items)} produktów ze zdjęcia!")
-                            st.rerun()
-                        elif isinstance(items, dict):
-                             if 'ingredients' in items:
-                                 for item in items['ingredients']:
-                                     list_obj.add_to_content(item)
-                                 st.success(f"Dodano {len(items['ingredients'])} produktów ze zdjęcia!")
-                                 st.rerun()
-                             else:
-                                 list_obj.add_to_content(items)
-                                 st.success("Dodano produkt ze zdjęcia!")
-                                 st.rerun()
-                        else:
-                            st.error(f"Nieoczekiwany format danych: {type(items)}")
-                            
+                        # Wszystkie zdjęcia przetwarzane równolegle, wynik jest już połączoną listą
+                        items = st.session_state.photo_reader.get_list_from_images(
+                            [uploaded_file.getvalue() for uploaded_file in uploaded_files]
+                        )
+                        list_obj.add_many(items)
+                        st.success(f"Dodano {len(items)} produktów ze zdjęć!")
+                        st.rerun()
                     except Exception as e:
                         st.error(f"Wystąpił błąd: {e}")
 
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,63 @@
+import json
+import os
+
+DEFAULT_STATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "crawl_state.json")
+
+# Sygnał Scrapy wysyłany przez pipeline po zapisaniu paczki w Neo4j (argument: slugs).
+# Stan przepisu jest aktualizowany dopiero wtedy, więc nieudany zapis zostanie ponowiony przy następnym crawlu.
+recipes_stored = object()
+
+
+def listing_marker(info):
+    # Znacznik wersji przepisu z API (data modyfikacji, a gdy jej brak - publikacji)
+    return info.get('modified') or info.get('publish')
+
+
+class CrawlState:
+    """Znane slugi przepisów z ich znacznikiem wersji i nagłówkami ETag/Last-Modified."""
+
+    def __init__(self, path=DEFAULT_STATE_PATH, entries=None):
+        self.path = path
+        self.entries = entries if entries is not None else self.load()
+
+    def load(self):
+        if os.path.isfile(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {}
+
+    @classmethod
+    def from_graph(cls, driver, path=DEFAULT_STATE_PATH):
+        state = cls(path)
+        records, _, _ = driver.execute_query(
+            "MATCH (r:Recipe) RETURN r.slug AS slug, coalesce(r.modified, r.publish) AS marker"
+        )
+        for record in records:
+            state.entries.setdefault(record["slug"], {})["marker"] = record["marker"]
+        return state
+
+    def is_known(self, slug):
+        return slug in self.entries
+
+    def is_unchanged(self, slug, marker):
+        entry = self.entries.get(slug)
+        return entry is not None and entry.get("marker") == marker
+
+    def conditional_headers(self, slug):
+        entry = self.entries.get(slug) or {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def update(self, slug, marker=None, etag=None, last_modified=None):
+        self.entries[slug] = {"marker": marker, "etag": etag, "last_modified": last_modified}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
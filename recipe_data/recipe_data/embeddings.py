@@ -0,0 +1,92 @@
+import argparse
+import functools
+import hashlib
+import os
+import time
+
+from dotenv import load_dotenv
+from neo4j import GraphDatabase
+
+VECTOR_INDEX_NAME = "recipes_vector"
+
+RECIPES_QUERY = """
+MATCH (r:Recipe)
+OPTIONAL MATCH (r)-[:CONTAINS]->(i:Ingredient)
+WITH r, collect(i.name) AS ingredients
+RETURN r.slug AS slug, r.title AS title, ingredients, r.embedding_hash AS embedding_hash
+"""
+
+VECTOR_INDEX_EXISTS_QUERY = "SHOW VECTOR INDEXES YIELD name WHERE name = $name RETURN name"
+
+SAVE_EMBEDDINGS_QUERY = """
+UNWIND $batch AS row
+MATCH (r:Recipe {slug: row.slug})
+SET r.embedding = row.embedding,
+    r.embedding_hash = row.hash
+"""
+
+
+@functools.lru_cache(maxsize=None)
+def get_embeddings():
+    # Jeden klient na proces, współdzielony przez narzędzia i cache odpowiedzi
+    from langchain_openai import AzureOpenAIEmbeddings
+
+    load_dotenv(override=True)
+    return AzureOpenAIEmbeddings(
+        api_key=os.getenv("AZURE_EMBEDDING_API_KEY"),
+        api_version=os.getenv("AZURE_EMBEDDING_API_VERSIONS"),
+        model=os.getenv("AZURE_EMBEDDING_MODEL"),
+        azure_endpoint=os.getenv("AZURE_EMBEDDING_ENDPOINT"),
+    )
+
+
+def recipe_text(title, ingredients):
+    return f"{title}\nSkładniki: {', '.join(sorted(ingredients))}"
+
+
+def content_hash(title, ingredients):
+    return hashlib.sha256(recipe_text(title or "", ingredients).encode("utf-8")).hexdigest()
+
+
+def ensure_vector_index(driver, dimensions):
+    driver.execute_query(
+        f"CREATE VECTOR INDEX {VECTOR_INDEX_NAME} IF NOT EXISTS FOR (r:Recipe) ON (r.embedding) "
+        f"OPTIONS {{indexConfig: {{`vector.dimensions`: {int(dimensions)}, `vector.similarity_function`: 'cosine'}}}}"
+    )
+
+
+def embed_pending_recipes(driver, embeddings=None, batch_size=64, log=print):
+    """Liczy embeddingi tylko dla przepisów, których tytuł lub składniki się zmieniły."""
+    records, _, _ = driver.execute_query(RECIPES_QUERY)
+    pending = []
+    for record in records:
+        digest = content_hash(record["title"], record["ingredients"])
+        if digest != record["embedding_hash"]:
+            pending.append((record["slug"], recipe_text(record["title"] or "", record["ingredients"]), digest))
+    log(f"Embeddings: {len(pending)} of {len(records)} recipes need (re)embedding")
+    if not pending:
+        return 0
+
+    embeddings = embeddings or get_embeddings()
+    start = time.perf_counter()
+    for offset in range(0, len(pending), batch_size):
+        chunk = pending[offset:offset + batch_size]
+        vectors = embeddings.embed_documents([text for _, text, _ in chunk])
+        if offset == 0:
+            ensure_vector_index(driver, len(vectors[0]))
+        driver.execute_query(SAVE_EMBEDDINGS_QUERY, batch=[
+            {"slug": slug, "embedding": vector, "hash": digest}
+            for (slug, _, digest), vector in zip(chunk, vectors)
+        ])
+    log(f"Embeddings: embedded {len(pending)} recipes in {time.perf_counter() - start:.2f}s")
+    return len(pending)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Liczy brakujące embeddingi przepisów")
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+    load_dotenv(override=True)
+    uri = os.getenv("NEO4J_URI", "bolt://localhost:7687")
+    with GraphDatabase.driver(uri, auth=("neo4j", os.getenv("NEO4J_PASSWORD"))) as driver:
+        embed_pending_recipes(driver, batch_size=args.batch_size)
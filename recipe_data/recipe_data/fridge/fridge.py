@@ -1,9 +1,6 @@
-from recipe_data.recipe_data.shopping_list.shopping_list import ListBlueprint
-import os
+from recipe_data.recipe_data.shopping_list.shopping_list import ListBlueprint, data_path
 
 
 class Fridge(ListBlueprint):
-    def __init__(self):
-        base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        data_path = os.path.join(base_path, "data", "fridge.json")
-        super().__init__(data_path)
\ No newline at end of file
+    def __init__(self, user_id=None):
+        super().__init__(data_path("fridge.json", user_id))
@@ -1,47 +1,237 @@
+import hashlib
 import json
 import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+# Identyfikator użytkownika trafia do ścieżki pliku - bez "/", ".." itp.
+USER_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def validate_user_id(user_id):
+    if user_id is not None and not USER_ID_RE.match(str(user_id)):
+        raise ValueError(f"Invalid user id: {user_id!r}")
+    return user_id
+
+
+def data_path(filename, user_id=None):
+    # Domyślny użytkownik korzysta bezpośrednio z data/, pozostali z data/users/<id>/
+    validate_user_id(user_id)
+    data_dir = DATA_DIR if user_id is None else os.path.join(DATA_DIR, "users", str(user_id))
+    return os.path.join(data_dir, filename)
+
+
+def _merge(items, key, ingredient_to_add):
+    ingredient = items.get(key)
+    if ingredient is None:
+        items[key] = dict(ingredient_to_add)
+    else:
+        ingredient["quantity"] += ingredient_to_add["quantity"]
+
+
+def _subtract(items, key, thing_to_remove):
+    ingredient = items.get(key)
+    if ingredient is None:
+        return False
+    if ingredient["quantity"] <= thing_to_remove["quantity"]:
+        del items[key]
+    else:
+        ingredient["quantity"] -= thing_to_remove["quantity"]
+    return True
 
 
 class ListBlueprint:
-    def __init__(self, filename):
+    """
+    Lista produktów zapisywana w pliku JSON. Zmiany wewnątrz batch() są zapisywane raz,
+    na końcu bloku, a plik podmieniany atomowo (zapis do pliku tymczasowego + rename).
+    Z op_log=True (lub LIST_OP_LOG=1) zmiany są dopisywane do dziennika operacji,
+    a pełny plik przepisywany dopiero co compact_every operacji.
+    version rośnie przy każdej zmianie, a refresh() wczytuje plik tylko wtedy,
+    gdy zmienił się poza tym obiektem (mtime/rozmiar).
+    Pierwsza linia dziennika zawiera skrót pliku, do którego się odnosi - po przerwanej
+    kompakcji (nowy plik zapisany, stary dziennik jeszcze nie usunięty) dziennik jest pomijany.
+    """
+
+    def __init__(self, filename, op_log=None, compact_every=200):
         self.filename = filename
+        self.op_log = os.getenv("LIST_OP_LOG") == "1" if op_log is None else op_log
+        self.log_path = f"{filename}.log"
+        self.compact_every = compact_every
+        # Ta sama lista może być modyfikowana z kilku sesji tego samego użytkownika
+        self.lock = threading.RLock()
+        # Produkty indeksowane po (nazwa, jednostka) - słownik zachowuje kolejność dodawania
+        self.items = {}
+        self.batch_depth = 0
+        self.pending_ops = []
+        self.dirty = False
+        self.logged_ops = 0
+        self.version = 0
+        self.snapshot_hash = None
         self.content = self.load_content()
+        self.signature = self._file_signature()
+
+    @staticmethod
+    def key_for(ingredient):
+        return (
+            str(ingredient.get("ingredient", "")).strip().lower(),
+            str(ingredient.get("unit") or "").strip().lower(),
+        )
+
+    @property
+    def content(self):
+        return list(self.items.values())
+
+    @content.setter
+    def content(self, ingredients):
+        with self.lock:
+            self.items = {}
+            for ingredient in ingredients or []:
+                _merge(self.items, self.key_for(ingredient), ingredient)
+            self.version += 1
+
+    def _file_signature(self):
+        signature = []
+        for path in (self.filename, self.log_path):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                signature.append(None)
+            else:
+                signature.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def refresh(self):
+        """Zwraca aktualną zawartość; plik jest czytany ponownie tylko po zmianie z zewnątrz."""
+        with self.lock:
+            signature = self._file_signature()
+            if signature != self.signature:
+                self.content = self.load_content()
+                self.signature = self._file_signature()
+            return self.content
+
+    @staticmethod
+    def _hash(text):
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
 
     def load_content(self):
-        if os.path.isfile(self.filename):
-            with open(self.filename, "r") as f:
-                return json.load(f)
-        else:
+        if not os.path.isfile(self.filename):
             self.save_content([])
             return []
+        with open(self.filename, "r") as f:
+            text = f.read()
+        content = json.loads(text)
+        self.snapshot_hash = self._hash(text)
+        self.logged_ops = 0
+        if not self.op_log or not os.path.isfile(self.log_path):
+            return content
+
+        # Odtworzenie operacji zapisanych po ostatniej kompakcji
+        items = {}
+        for ingredient in content:
+            _merge(items, self.key_for(ingredient), ingredient)
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Urwany ostatni wpis (przerwany zapis) - pomijamy
+                    break
+                if "snapshot" in entry:
+                    if entry["snapshot"] != self.snapshot_hash:
+                        # Dziennik sprzed kompakcji - jego operacje są już w pliku
+                        self.logged_ops = 0
+                        return content
+                    continue
+                apply = _merge if entry["op"] == "add" else _subtract
+                apply(items, self.key_for(entry["item"]), entry["item"])
+                self.logged_ops += 1
+        return list(items.values())
 
     def save_content(self, full_fridge_json):
-        json_str = json.dumps(full_fridge_json, indent=4)
-        with open(self.filename, "w") as f:
-            f.write(json_str)
+        directory = os.path.dirname(self.filename)
+        os.makedirs(directory, exist_ok=True)
+        text = json.dumps(full_fridge_json, indent=4)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(text)
+            os.replace(tmp_path, self.filename)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self.snapshot_hash = self._hash(text)
+
+    @contextmanager
+    def batch(self):
+        """Grupuje zmiany - plik jest zapisywany raz, po wyjściu z najbardziej zewnętrznego bloku."""
+        with self.lock:
+            self.batch_depth += 1
+            try:
+                yield self
+            finally:
+                self.batch_depth -= 1
+                if self.batch_depth == 0:
+                    self.flush()
+
+    def flush(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            if self.op_log and self.logged_ops + len(self.pending_ops) < self.compact_every:
+                if self.logged_ops == 0:
+                    # Nowy dziennik (albo pozostałość po przerwanej kompakcji) - zaczyna się od skrótu pliku
+                    with open(self.log_path, "w", encoding="utf-8") as f:
+                        f.write(json.dumps({"snapshot": self.snapshot_hash}) + "\n")
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write("".join(self.pending_ops))
+                self.logged_ops += len(self.pending_ops)
+            else:
+                self.compact()
+            self.pending_ops = []
+            self.dirty = False
+            self.signature = self._file_signature()
+
+    def compact(self):
+        with self.lock:
+            self.save_content(self.content)
+            if os.path.isfile(self.log_path):
+                os.remove(self.log_path)
+            self.logged_ops = 0
+
+    def _record(self, op, ingredient):
+        # Operacja serializowana od razu - słowniki w self.items zmieniają się przy kolejnych dodaniach
+        if self.op_log:
+            self.pending_ops.append(json.dumps({"op": op, "item": ingredient}, ensure_ascii=False) + "\n")
+        self.dirty = True
+        self.version += 1
 
     def add_to_content(self, ingredient_to_add):
-        found = False
-        for ingredient in self.content:
-            if ingredient["ingredient"] == ingredient_to_add["ingredient"] and ingredient.get("unit") == ingredient_to_add.get("unit"):
-                ingredient["quantity"] += ingredient_to_add["quantity"]
-                found = True
-                break
-        if not found:
-            self.content.append(ingredient_to_add)
-        self.save_content(self.content)
+        self.add_many([ingredient_to_add])
+
+    def add_many(self, ingredients):
+        with self.batch():
+            for ingredient in ingredients:
+                self._add(ingredient)
+
+    def _add(self, ingredient_to_add):
+        self._record("add", ingredient_to_add)
+        _merge(self.items, self.key_for(ingredient_to_add), ingredient_to_add)
 
     def remove_from_content(self, thing_to_remove):
-        found = False
-        for ingredient in self.content:
-            if ingredient["ingredient"] == thing_to_remove["ingredient"] and ingredient.get("unit") == thing_to_remove.get("unit"):
-                if ingredient["quantity"] <= thing_to_remove["quantity"]:
-                    self.content.remove(ingredient)
-                else:
-                    ingredient["quantity"] -= thing_to_remove["quantity"]
-                found = True
-                break
-        if not found:
-            print("Nie znaleziono składnika")
+        self.remove_many([thing_to_remove])
+
+    def remove_many(self, things_to_remove):
+        with self.batch():
+            for thing_to_remove in things_to_remove:
+                self._remove(thing_to_remove)
 
-        self.save_content(self.content)
\ No newline at end of file
+    def _remove(self, thing_to_remove):
+        key = self.key_for(thing_to_remove)
+        if key not in self.items:
+            print("Nie znaleziono składnika")
+            return
+        self._record("remove", thing_to_remove)
+        _subtract(self.items, key, thing_to_remove)
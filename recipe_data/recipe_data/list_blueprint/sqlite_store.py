@@ -0,0 +1,220 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from recipe_data.recipe_data.list_blueprint.list_blueprint import ListBlueprint, data_path
+
+DEFAULT_DB_PATH = data_path("lists.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS list_items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    list_name TEXT NOT NULL,
+    ingredient_key TEXT NOT NULL,
+    unit_key TEXT NOT NULL,
+    ingredient TEXT NOT NULL,
+    unit TEXT,
+    category TEXT,
+    quantity NUMERIC NOT NULL,
+    UNIQUE (user_id, list_name, ingredient_key, unit_key)
+);
+CREATE INDEX IF NOT EXISTS list_items_ingredient ON list_items (user_id, list_name, ingredient_key);
+CREATE INDEX IF NOT EXISTS list_items_category ON list_items (user_id, list_name, category);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+UPSERT_QUERY = """
+INSERT INTO list_items (user_id, list_name, ingredient_key, unit_key, ingredient, unit, category, quantity)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (user_id, list_name, ingredient_key, unit_key)
+DO UPDATE SET quantity = quantity + excluded.quantity
+"""
+
+SUBTRACT_QUERY = """
+UPDATE list_items SET quantity = quantity - ?
+WHERE user_id = ? AND list_name = ? AND ingredient_key = ? AND unit_key = ? AND quantity > ?
+"""
+
+DELETE_QUERY = """
+DELETE FROM list_items
+WHERE user_id = ? AND list_name = ? AND ingredient_key = ? AND unit_key = ?
+"""
+
+SELECT_QUERY = """
+SELECT ingredient, quantity, unit, category FROM list_items
+WHERE user_id = ? AND list_name = ?
+ORDER BY id
+"""
+
+FIND_QUERY = """
+SELECT ingredient, quantity, unit, category FROM list_items
+WHERE user_id = ? AND list_name = ? AND ingredient_key = ?
+ORDER BY id
+"""
+
+TOTALS_QUERY = """
+SELECT coalesce(category, 'Inne') AS category, unit, sum(quantity) AS quantity, count(*) AS items
+FROM list_items
+WHERE user_id = ? AND list_name = ?
+GROUP BY coalesce(category, 'Inne'), unit
+ORDER BY category, unit
+"""
+
+
+class SQLiteListBlueprint:
+    """
+    Lista produktów w SQLite - ten sam interfejs co ListBlueprint, ale zmiany dotyczą pojedynczych
+    wierszy, a wszyscy użytkownicy i listy dzielą jedną bazę (partycjonowanie po user_id i list_name).
+    Przy pierwszym użyciu dane są jednorazowo przenoszone z pliku JSON (json_path).
+    """
+
+    key_for = staticmethod(ListBlueprint.key_for)
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, list_name="fridge", user_id=None, json_path=None):
+        self.db_path = db_path
+        self.list_name = list_name
+        self.user_id = "" if user_id is None else str(user_id)
+        self.lock = threading.RLock()
+        self.batch_depth = 0
+        self.version = 0
+        self.cached_content = None
+        self.data_version = None
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        # Jedno połączenie na listę, dostęp serializowany przez self.lock
+        self.connection = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+        if json_path is not None:
+            self.migrate_json(json_path)
+
+    def _partition(self):
+        return self.user_id, self.list_name
+
+    @staticmethod
+    def _row_to_item(row):
+        item = {"ingredient": row["ingredient"], "quantity": row["quantity"]}
+        if row["unit"] is not None:
+            item["unit"] = row["unit"]
+        if row["category"] is not None:
+            item["category"] = row["category"]
+        return item
+
+    def migrate_json(self, json_path):
+        marker = f"migrated:{self.user_id}:{self.list_name}"
+        with self.lock:
+            if self.connection.execute("SELECT 1 FROM meta WHERE key = ?", (marker,)).fetchone():
+                return
+            content = []
+            if os.path.isfile(json_path):
+                with open(json_path, "r") as f:
+                    content = json.load(f)
+            with self.batch():
+                for ingredient in content:
+                    self._add(ingredient)
+                self.connection.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (marker, json_path))
+
+    @property
+    def content(self):
+        return self.refresh()
+
+    @content.setter
+    def content(self, ingredients):
+        with self.batch():
+            self.connection.execute(
+                "DELETE FROM list_items WHERE user_id = ? AND list_name = ?", self._partition()
+            )
+            for ingredient in ingredients or []:
+                self._add(ingredient)
+
+    def load_content(self):
+        with self.lock:
+            rows = self.connection.execute(SELECT_QUERY, self._partition()).fetchall()
+        return [self._row_to_item(row) for row in rows]
+
+    def refresh(self):
+        """Zwraca zawartość; baza jest odpytywana tylko po zmianie (także z innego połączenia)."""
+        with self.lock:
+            data_version = self.connection.execute("PRAGMA data_version").fetchone()[0]
+            if self.cached_content is None or data_version != self.data_version:
+                self.cached_content = self.load_content()
+                self.data_version = data_version
+            return list(self.cached_content)
+
+    def find(self, ingredient):
+        with self.lock:
+            rows = self.connection.execute(
+                FIND_QUERY, (*self._partition(), self.key_for({"ingredient": ingredient})[0])
+            ).fetchall()
+        return [self._row_to_item(row) for row in rows]
+
+    def totals_by_category(self):
+        with self.lock:
+            rows = self.connection.execute(TOTALS_QUERY, self._partition()).fetchall()
+        return [dict(row) for row in rows]
+
+    @contextmanager
+    def batch(self):
+        """Grupuje zmiany w jedną transakcję."""
+        with self.lock:
+            if self.batch_depth == 0:
+                self.connection.execute("BEGIN IMMEDIATE")
+            self.batch_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self.batch_depth -= 1
+                if self.batch_depth == 0:
+                    self.connection.execute("ROLLBACK")
+                    self.cached_content = None
+                raise
+            else:
+                self.batch_depth -= 1
+                if self.batch_depth == 0:
+                    self.connection.execute("COMMIT")
+                    self.cached_content = None
+
+    def _changed(self):
+        self.version += 1
+        self.cached_content = None
+
+    def add_to_content(self, ingredient_to_add):
+        self.add_many([ingredient_to_add])
+
+    def add_many(self, ingredients):
+        with self.batch():
+            for ingredient in ingredients:
+                self._add(ingredient)
+
+    def _add(self, ingredient_to_add):
+        ingredient_key, unit_key = self.key_for(ingredient_to_add)
+        self.connection.execute(UPSERT_QUERY, (
+            *self._partition(), ingredient_key, unit_key,
+            ingredient_to_add["ingredient"], ingredient_to_add.get("unit"),
+            ingredient_to_add.get("category"), ingredient_to_add["quantity"],
+        ))
+        self._changed()
+
+    def remove_from_content(self, thing_to_remove):
+        self.remove_many([thing_to_remove])
+
+    def remove_many(self, things_to_remove):
+        with self.batch():
+            for thing_to_remove in things_to_remove:
+                self._remove(thing_to_remove)
+
+    def _remove(self, thing_to_remove):
+        key = (*self._partition(), *self.key_for(thing_to_remove))
+        quantity = thing_to_remove["quantity"]
+        if self.connection.execute(SUBTRACT_QUERY, (quantity, *key, quantity)).rowcount == 0:
+            if self.connection.execute(DELETE_QUERY, key).rowcount == 0:
+                print("Nie znaleziono składnika")
+                return
+        self._changed()
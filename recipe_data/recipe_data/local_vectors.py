@@ -0,0 +1,134 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+from neo4j import GraphDatabase
+
+DEFAULT_VECTOR_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "vectors")
+
+EXPORT_QUERY = """
+MATCH (r:Recipe) WHERE r.embedding IS NOT NULL
+RETURN r.slug AS slug, r.title AS title, r.url AS url, r.embedding AS embedding
+ORDER BY r.slug
+"""
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def _spherical_kmeans(matrix, n_lists, n_iter=10, seed=0):
+    rng = np.random.default_rng(seed)
+    centroids = matrix[rng.choice(len(matrix), n_lists, replace=False)].copy()
+    for _ in range(n_iter):
+        labels = np.argmax(matrix @ centroids.T, axis=1)
+        for list_id in range(n_lists):
+            members = matrix[labels == list_id]
+            if len(members):
+                centroids[list_id] = members.sum(axis=0)
+        centroids = _normalize(centroids)
+    return centroids, np.argmax(matrix @ centroids.T, axis=1)
+
+
+def export_embeddings(driver, directory=DEFAULT_VECTOR_DIR, ivf_lists=0):
+    """Zrzuca embeddingi przepisów z Neo4j do macierzy .npy (wiersze znormalizowane) i pliku z metadanymi."""
+    records, _, _ = driver.execute_query(EXPORT_QUERY)
+    os.makedirs(directory, exist_ok=True)
+    matrix = _normalize(np.asarray([record["embedding"] for record in records], dtype=np.float32))
+    np.save(os.path.join(directory, "embeddings.npy"), matrix)
+    with open(os.path.join(directory, "recipes.json"), "w", encoding="utf-8") as f:
+        json.dump([{"slug": r["slug"], "title": r["title"], "url": r["url"]} for r in records], f, ensure_ascii=False)
+    for name in ("ivf_centroids.npy", "ivf_labels.npy"):
+        if os.path.isfile(os.path.join(directory, name)):
+            os.remove(os.path.join(directory, name))
+    if ivf_lists and len(matrix) > ivf_lists:
+        centroids, labels = _spherical_kmeans(matrix, ivf_lists)
+        np.save(os.path.join(directory, "ivf_centroids.npy"), centroids.astype(np.float32))
+        np.save(os.path.join(directory, "ivf_labels.npy"), labels.astype(np.int32))
+    return len(matrix)
+
+
+class LocalVectorIndex:
+    """Wyszukiwanie top-k po iloczynie skalarnym na macierzy mapowanej z dysku (opcjonalnie IVF)."""
+
+    def __init__(self, directory=DEFAULT_VECTOR_DIR, n_probe=8):
+        self.matrix = np.load(os.path.join(directory, "embeddings.npy"), mmap_mode="r")
+        with open(os.path.join(directory, "recipes.json"), "r", encoding="utf-8") as f:
+            self.recipes = json.load(f)
+        self.n_probe = n_probe
+        self.centroids = None
+        self.lists = None
+        centroids_path = os.path.join(directory, "ivf_centroids.npy")
+        if os.path.isfile(centroids_path):
+            self.centroids = np.load(centroids_path)
+            labels = np.load(os.path.join(directory, "ivf_labels.npy"))
+            self.lists = [np.flatnonzero(labels == list_id) for list_id in range(len(self.centroids))]
+
+    def __len__(self):
+        return len(self.recipes)
+
+    def search(self, vector, k=4):
+        query = _normalize(np.asarray(vector, dtype=np.float32))
+        if self.centroids is None:
+            candidates = None
+            scores = self.matrix @ query
+        else:
+            probe = np.argsort(self.centroids @ query)[::-1][:self.n_probe]
+            candidates = np.concatenate([self.lists[list_id] for list_id in probe])
+            scores = self.matrix[candidates] @ query
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(scores[top])[::-1]]
+        ids = top if candidates is None else candidates[top]
+        return [dict(self.recipes[i], score=float(s)) for i, s in zip(ids, scores[top])]
+
+
+def benchmark(driver, directory, queries=200, k=4):
+    # Import tutaj - aplikacja ładuje ten moduł jako recipe_data.recipe_data.local_vectors
+    from recipe_data.embeddings import VECTOR_INDEX_NAME
+
+    index = LocalVectorIndex(directory)
+    rng = np.random.default_rng(0)
+    vectors = [np.asarray(index.matrix[i]).tolist() for i in rng.choice(len(index), min(queries, len(index)), replace=False)]
+
+    start = time.perf_counter()
+    local_results = [index.search(vector, k) for vector in vectors]
+    local_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    neo4j_results = []
+    for vector in vectors:
+        records, _, _ = driver.execute_query(
+            "CALL db.index.vector.queryNodes($index_name, $k, $vector) YIELD node RETURN node.slug AS slug",
+            index_name=VECTOR_INDEX_NAME, k=k, vector=vector,
+        )
+        neo4j_results.append([record["slug"] for record in records])
+    neo4j_time = time.perf_counter() - start
+
+    overlap = np.mean([len({r["slug"] for r in local} & set(remote)) / k for local, remote in zip(local_results, neo4j_results)])
+    print(f"{len(index)} recipes, {len(vectors)} queries, k={k}, ivf={'yes' if index.centroids is not None else 'no'}")
+    print(f"local  {local_time / len(vectors) * 1000:8.3f} ms/query")
+    print(f"neo4j  {neo4j_time / len(vectors) * 1000:8.3f} ms/query")
+    print(f"top-{k} overlap with neo4j: {overlap:.2%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lokalny indeks wektorowy przepisów")
+    parser.add_argument("command", choices=["export", "bench"])
+    parser.add_argument("--dir", default=DEFAULT_VECTOR_DIR)
+    parser.add_argument("--ivf-lists", type=int, default=0)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    load_dotenv(override=True)
+    uri = os.getenv("NEO4J_URI", "bolt://localhost:7687")
+    with GraphDatabase.driver(uri, auth=("neo4j", os.getenv("NEO4J_PASSWORD"))) as driver:
+        if args.command == "export":
+            print(f"Exported {export_embeddings(driver, args.dir, args.ivf_lists)} embeddings to {args.dir}")
+        else:
+            benchmark(driver, args.dir, queries=args.queries)
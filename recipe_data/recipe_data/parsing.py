@@ -0,0 +1,189 @@
+import argparse
+import glob
+import json
+import os
+import re
+import time
+from html.parser import HTMLParser
+
+try:
+    from lxml import html as lxml_html
+except ImportError:
+    lxml_html = None
+
+# Interesuje nas tylko div ze składnikami - reszta treści przepisu jest pomijana
+INGREDIENTS_DIV_RE = re.compile(r"""<div\b[^>]*\bid\s*=\s*["']?recipeIngredients\b""", re.IGNORECASE)
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+INGREDIENTS_XPATH = './/div[@id="recipeIngredients"]//li//span[@itemprop="recipeIngredient"]'
+NAME_XPATH = './/span[contains(concat(" ", normalize-space(@class), " "), " ingredient ")]'
+QTY_XPATH = './/span[contains(concat(" ", normalize-space(@class), " "), " qty ")]'
+
+
+def _join_stripped(strings):
+    # Odpowiednik BeautifulSoup.get_text(strip=True)
+    return "".join(s.strip() for s in strings if s.strip())
+
+
+class _StopParsing(Exception):
+    pass
+
+
+class _IngredientExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.ingredients = []
+        self.stack = []
+        self.in_div = False
+        self.li_depth = 0
+        self.current = None
+        self.capture = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            return
+        attrs = dict(attrs)
+        role = None
+        if not self.in_div:
+            if tag == "div" and attrs.get("id") == "recipeIngredients":
+                self.in_div = True
+                role = "div"
+        elif tag == "li":
+            self.li_depth += 1
+            role = "li"
+        elif tag == "span" and self.li_depth and self.current is None and attrs.get("itemprop") == "recipeIngredient":
+            self.current = {"name": None, "qty": None}
+            role = "item"
+        elif tag == "span" and self.current is not None and self.capture is None:
+            classes = (attrs.get("class") or "").split()
+            if "ingredient" in classes and self.current["name"] is None:
+                self.current["name"] = []
+                self.capture = role = "name"
+            elif "qty" in classes and self.current["qty"] is None:
+                self.current["qty"] = []
+                self.capture = role = "qty"
+        self.stack.append((tag, role))
+
+    def handle_startendtag(self, tag, attrs):
+        pass
+
+    def handle_endtag(self, tag):
+        if not any(open_tag == tag for open_tag, _ in self.stack):
+            return
+        while self.stack:
+            open_tag, role = self.stack.pop()
+            self._close(role)
+            if open_tag == tag:
+                break
+
+    def _close(self, role):
+        if role in ("name", "qty"):
+            self.capture = None
+        elif role == "li":
+            self.li_depth -= 1
+        elif role == "item":
+            name = _join_stripped(self.current["name"] or [])
+            if name:
+                self.ingredients.append({"name": name, "qty": _join_stripped(self.current["qty"] or [])})
+            self.current = None
+        elif role == "div":
+            raise _StopParsing()
+
+    def handle_data(self, data):
+        if self.capture:
+            self.current[self.capture].append(data)
+
+
+def _ingredients_fragment(body_html):
+    match = INGREDIENTS_DIV_RE.search(body_html or "")
+    return body_html[match.start():] if match else None
+
+
+def _extract_with_lxml(fragment):
+    root = lxml_html.fragment_fromstring(fragment, create_parent="div")
+    ingredients = []
+    for ing_span in root.xpath(INGREDIENTS_XPATH):
+        name_spans = ing_span.xpath(NAME_XPATH)
+        qty_spans = ing_span.xpath(QTY_XPATH)
+        name = _join_stripped(name_spans[0].itertext()) if name_spans else None
+        if name:
+            ingredients.append({"name": name, "qty": _join_stripped(qty_spans[0].itertext()) if qty_spans else ""})
+    return ingredients
+
+
+def _extract_with_html_parser(fragment):
+    extractor = _IngredientExtractor()
+    try:
+        extractor.feed(fragment)
+        extractor.close()
+    except _StopParsing:
+        pass
+    return extractor.ingredients
+
+
+def extract_ingredients(body_html, backend=None):
+    """Zwraca listę {'name', 'qty'} z diva recipeIngredients treści przepisu."""
+    fragment = _ingredients_fragment(body_html)
+    if fragment is None:
+        return []
+    backend = backend or ("lxml" if lxml_html is not None else "html.parser")
+    if backend == "lxml":
+        return _extract_with_lxml(fragment)
+    return _extract_with_html_parser(fragment)
+
+
+def extract_ingredients_bs4(body_html):
+    # Dawna implementacja z RecipeDataPipeline - punkt odniesienia dla benchmarku
+    from bs4 import BeautifulSoup
+
+    ingredients = []
+    if not body_html:
+        return ingredients
+    soup = BeautifulSoup(body_html, 'html.parser')
+    ingredients_div = soup.find('div', id='recipeIngredients')
+    if ingredients_div:
+        for ing_span in ingredients_div.select('li span[itemprop="recipeIngredient"]'):
+            name_span = ing_span.find('span', class_='ingredient')
+            qty_span = ing_span.find('span', class_='qty')
+            ing_name = name_span.get_text(strip=True) if name_span else None
+            if ing_name:
+                ingredients.append({'name': ing_name, 'qty': qty_span.get_text(strip=True) if qty_span else ""})
+    return ingredients
+
+
+def load_bodies(corpus_dir):
+    bodies = []
+    for path in sorted(glob.glob(os.path.join(corpus_dir, "*"))):
+        if path.endswith(".html"):
+            with open(path, encoding="utf-8") as f:
+                bodies.append(f.read())
+        elif path.endswith(".json"):
+            with open(path, encoding="utf-8") as f:
+                bodies.append(json.load(f).get("body") or "")
+    return bodies
+
+
+def benchmark(bodies, repeat=5):
+    implementations = {"bs4": extract_ingredients_bs4, "html.parser": lambda b: extract_ingredients(b, "html.parser")}
+    if lxml_html is not None:
+        implementations["lxml"] = lambda b: extract_ingredients(b, "lxml")
+
+    reference = [extract_ingredients_bs4(body) for body in bodies]
+    for name, extract in implementations.items():
+        mismatches = sum(extract(body) != expected for body, expected in zip(bodies, reference))
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for body in bodies:
+                extract(body)
+            best = min(best, time.perf_counter() - start)
+        print(f"{name:12} {best * 1000:9.2f} ms total  {best / max(len(bodies), 1) * 1e6:9.1f} us/recipe  mismatches={mismatches}")
+
+
+if __name__ == "__main__":
+    ## Benchmark: katalog z zapisanymi odpowiedziami API (*.json) lub treściami przepisów (*.html)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("corpus_dir")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    benchmark(load_bodies(args.corpus_dir), repeat=args.repeat)
@@ -1,90 +1,240 @@
+import asyncio
 import os
 
 from dotenv import load_dotenv
-from neo4j import GraphDatabase
-from bs4 import BeautifulSoup
+from neo4j import AsyncGraphDatabase, GraphDatabase
+
+from recipe_data.crawl_state import recipes_stored
+from recipe_data.embeddings import embed_pending_recipes
+from recipe_data.parsing import extract_ingredients
+from recipe_data.quantities import parse_quantity
+from recipe_data.schema import ensure_schema, ensure_schema_async, report_schema
+
+class IngredientParsingPipeline:
+    # Osobny etap przed zapisem do bazy: parsuje tylko div ze składnikami
+    # i zostawia gotową listę {'name', 'qty'} na przedmiocie.
+    def process_item(self, item, spider):
+        item['parsed_ingredients'] = extract_ingredients(item.get('body', ''))
+        return item
+
 
 class RecipeDataPipeline:
-    def __init__(self):
+    # Każde zapytanie przetwarza całą paczkę przepisów naraz (UNWIND $batch),
+    # więc flush to kilka round tripów niezależnie od liczby przepisów i składników.
+    batch_queries = (
+        """
+        UNWIND $batch AS row
+        MERGE (r:Recipe {slug: row.slug})
+        SET r.id = row.id,
+            r.title = row.title,
+            r.prep_time = row.prep_time,
+            r.yield_amount = row.yield_amount,
+            r.url = row.url,
+            r.publish = row.publish,
+            r.modified = row.modified,
+            r.last_updated = datetime()
+        """,
+        """
+        UNWIND $batch AS row
+        WITH row WHERE row.cuisine IS NOT NULL
+        MATCH (r:Recipe {slug: row.slug})
+        MERGE (c:Cuisine {name: row.cuisine})
+        MERGE (r)-[:BELONGS_TO]->(c)
+        """,
+        """
+        UNWIND $batch AS row
+        MATCH (r:Recipe {slug: row.slug})
+        UNWIND row.diets AS diet
+        MERGE (d:Diet {name: diet})
+        MERGE (r)-[:SUITABLE_FOR]->(d)
+        """,
+        """
+        UNWIND $batch AS row
+        MATCH (r:Recipe {slug: row.slug})
+        UNWIND row.occasions AS occasion
+        MERGE (o:Occasion {name: occasion})
+        MERGE (r)-[:PERFECT_FOR]->(o)
+        """,
+        """
+        UNWIND $batch AS row
+        MATCH (r:Recipe {slug: row.slug})
+        UNWIND row.ingredients AS ing
+        MERGE (i:Ingredient {name: ing.name})
+        MERGE (r)-[rel:CONTAINS]->(i)
+        SET rel.quantity = ing.qty,
+            rel.raw = ing.raw,
+            rel.amount = ing.amount,
+            rel.unit = ing.unit,
+            rel.base_amount = ing.base_amount,
+            rel.base_unit = ing.base_unit
+        """,
+    )
+
+    def __init__(self, uri="bolt://localhost:7687", batch_size=1, embed_on_close=False, embedding_batch_size=64):
         load_dotenv(override=True)
-        self.driver = GraphDatabase.driver("bolt://localhost:7687", auth=("neo4j", os.getenv("NEO4J_PASSWORD")))
+        self.uri = uri
+        self.driver = self._create_driver()
+        self.batch_size = max(1, batch_size)
+        self.buffer = []
+        self.embed_on_close = embed_on_close
+        self.embedding_batch_size = embedding_batch_size
+        self.crawler = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        pipeline = cls(
+            uri=crawler.settings.get("NEO4J_URI", "bolt://localhost:7687"),
+            batch_size=crawler.settings.getint("NEO4J_BATCH_SIZE", 1),
+            embed_on_close=crawler.settings.getbool("EMBED_ON_CLOSE", False),
+            embedding_batch_size=crawler.settings.getint("EMBEDDING_BATCH_SIZE", 64),
+        )
+        pipeline.crawler = crawler
+        return pipeline
+
+    def _stored(self, batch):
+        if self.crawler is not None:
+            self.crawler.signals.send_catch_log(recipes_stored, slugs=[row['slug'] for row in batch])
+
+    def _create_driver(self):
+        return GraphDatabase.driver(self.uri, auth=("neo4j", os.getenv("NEO4J_PASSWORD")))
+
+    def open_spider(self, spider):
+        report_schema(*ensure_schema(self.driver), log=spider.logger.info)
 
     def close_spider(self, spider):
+        self.flush()
         self.driver.close()
+        if self.embed_on_close:
+            self._embed_pending(spider)
+
+    def _embed_pending(self, spider):
+        # Embeddingi tylko dla nowych / zmienionych przepisów, po zapisaniu wszystkich paczek
+        with GraphDatabase.driver(self.uri, auth=("neo4j", os.getenv("NEO4J_PASSWORD"))) as driver:
+            embed_pending_recipes(driver, batch_size=self.embedding_batch_size, log=spider.logger.info)
 
     def process_item(self, item, spider):
-        with self.driver.session() as session:
-            session.execute_write(self._save_recipe, item)
+        self.buffer.append(self._prepare_row(item))
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
         return item
 
+    def flush(self):
+        if not self.buffer:
+            return
+        batch, self.buffer = self.buffer, []
+        with self.driver.session() as session:
+            session.execute_write(self._save_batch, batch)
+        self._stored(batch)
+
+    @classmethod
+    def _save_batch(cls, tx, batch):
+        for query in cls.batch_queries:
+            tx.run(query, batch=batch)
+
     @staticmethod
-    def _save_recipe(tx, item):
-        query_recipe = """
-        MERGE (r:Recipe {slug: $slug})
-        SET r.id = $id,
-            r.title = $title,
-            r.prep_time = $prep_time,
-            r.yield_amount = $yield_amount,
-            r.url = $url,
-            r.last_updated = datetime()
-        """
-        tx.run(query_recipe, 
-               id=item.get('id'), 
-               slug=item.get('slug'), 
-               title=item.get('title'),
-               prep_time=item.get('recipePrepTime'),
-               yield_amount=item.get('recipeYield'),
-               url=f"https://aniagotuje.pl/przepis/{item.get('slug')}"
+    def _prepare_row(item):
+        categories = item.get('categories') or []
+        ingredients = item.get('parsed_ingredients')
+        if ingredients is None:
+            ingredients = extract_ingredients(item.get('body', ''))
+        return {
+            'id': item.get('id'),
+            'slug': item.get('slug'),
+            'title': item.get('title'),
+            'prep_time': item.get('recipePrepTime'),
+            'yield_amount': item.get('recipeYield'),
+            'url': f"https://aniagotuje.pl/przepis/{item.get('slug')}",
+            'publish': item.get('publish'),
+            'modified': item.get('modified'),
+            'cuisine': item.get('recipeCuisine') or None,
+            'diets': [cat.get('name') for cat in categories if cat.get('type') == 'DIET' and cat.get('name')],
+            'occasions': [cat.get('name') for cat in categories if cat.get('type') == 'IDEA' and cat.get('name')],
+            # Ilość rozbita na liczbę i jednostkę (oraz g/ml), żeby dało się ją porównywać w zapytaniach
+            'ingredients': [dict(ing, **parse_quantity(ing.get('qty'))) for ing in ingredients],
+        }
+
+
+class AsyncRecipeDataPipeline(RecipeDataPipeline):
+    # Wymaga reaktora asyncio (domyślny w Scrapy >= 2.13). process_item oddaje
+    # sterowanie do pętli zdarzeń, więc pobieranie stron nie czeka na zapisy.
+    # Gdy wszystkie sloty NEO4J_MAX_INFLIGHT są zajęte, process_item czeka na
+    # wolny slot - przedmioty zostają w scraperze, a Scrapy (CONCURRENT_ITEMS,
+    # SCRAPER_SLOT_MAX_ACTIVE_SIZE) wstrzymuje wysyłanie kolejnych requestów.
+    def __init__(self, uri="bolt://localhost:7687", batch_size=1, max_inflight=4,
+                 embed_on_close=False, embedding_batch_size=64):
+        super().__init__(uri=uri, batch_size=batch_size, embed_on_close=embed_on_close,
+                         embedding_batch_size=embedding_batch_size)
+        self.max_inflight = max(1, max_inflight)
+        self.inflight = None
+        self.pending = set()
+        self.failed_batches = 0
+        self.logger = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        pipeline = cls(
+            uri=crawler.settings.get("NEO4J_URI", "bolt://localhost:7687"),
+            batch_size=crawler.settings.getint("NEO4J_BATCH_SIZE", 1),
+            max_inflight=crawler.settings.getint("NEO4J_MAX_INFLIGHT", 4),
+            embed_on_close=crawler.settings.getbool("EMBED_ON_CLOSE", False),
+            embedding_batch_size=crawler.settings.getint("EMBEDDING_BATCH_SIZE", 64),
         )
+        pipeline.crawler = crawler
+        return pipeline
+
+    def _create_driver(self):
+        # Sterownik asynchroniczny musi powstać w pętli zdarzeń reaktora - w open_spider
+        return None
+
+    async def open_spider(self, spider):
+        self.driver = AsyncGraphDatabase.driver(self.uri, auth=("neo4j", os.getenv("NEO4J_PASSWORD")))
+        self.logger = spider.logger
+        self.inflight = asyncio.Semaphore(self.max_inflight)
+        report_schema(*await ensure_schema_async(self.driver), log=spider.logger.info)
+
+    async def close_spider(self, spider):
+        await self.flush()
+        if self.pending:
+            await asyncio.gather(*self.pending, return_exceptions=True)
+        await self.driver.close()
+        # Embeddingi dla paczek zapisanych poprawnie liczone są mimo błędów pozostałych
+        if self.embed_on_close:
+            await asyncio.to_thread(self._embed_pending, spider)
+        if self.failed_batches:
+            # Błędy zapisów zalogowane w _write_done; zamknięcie spidera zgłasza je zbiorczo
+            raise RuntimeError(f"{self.failed_batches} Neo4j batch write(s) failed")
+
+    async def process_item(self, item, spider):
+        self.buffer.append(self._prepare_row(item))
+        if len(self.buffer) >= self.batch_size:
+            await self.flush()
+        return item
+
+    async def flush(self):
+        if not self.buffer:
+            return
+        batch, self.buffer = self.buffer, []
+        await self.inflight.acquire()
+        task = asyncio.ensure_future(self._write(batch))
+        self.pending.add(task)
+        task.add_done_callback(self._write_done)
+
+    def _write_done(self, task):
+        self.pending.discard(task)
+        if task.cancelled() or task.exception() is None:
+            return
+        self.failed_batches += 1
+        self.logger.error("Neo4j batch write failed", exc_info=task.exception())
+
+    async def _write(self, batch):
+        try:
+            async with self.driver.session() as session:
+                await session.execute_write(self._save_batch_async, batch)
+            self._stored(batch)
+        finally:
+            self.inflight.release()
 
-        cuisine = item.get('recipeCuisine')
-        if cuisine:
-            query_cuisine = """
-            MATCH (r:Recipe {slug: $slug})
-            MERGE (c:Cuisine {name: $cuisine})
-            MERGE (r)-[:BELONGS_TO]->(c)
-            """
-            tx.run(query_cuisine, slug=item.get('slug'), cuisine=cuisine)
-
-        categories = item.get('categories', [])
-        for cat in categories:
-            cat_type = cat.get('type')
-            cat_name = cat.get('name')
-            
-            if cat_type == 'DIET':
-                query_diet = """
-                MATCH (r:Recipe {slug: $slug})
-                MERGE (d:Diet {name: $name})
-                MERGE (r)-[:SUITABLE_FOR]->(d)
-                """
-                tx.run(query_diet, slug=item.get('slug'), name=cat_name)
-            
-            elif cat_type == 'IDEA': 
-                query_occasion = """
-                MATCH (r:Recipe {slug: $slug})
-                MERGE (o:Occasion {name: $name})
-                MERGE (r)-[:PERFECT_FOR]->(o)
-                """
-                tx.run(query_occasion, slug=item.get('slug'), name=cat_name)
-
-        body_html = item.get('body', '')
-        if body_html:
-            soup = BeautifulSoup(body_html, 'html.parser')
-            ingredients_div = soup.find('div', id='recipeIngredients')
-            if ingredients_div:
-                items = ingredients_div.select('li span[itemprop="recipeIngredient"]')
-                for ing_span in items:
-                    name_span = ing_span.find('span', class_='ingredient')
-                    qty_span = ing_span.find('span', class_='qty')
-                    
-                    ing_name = name_span.get_text(strip=True) if name_span else None
-                    ing_qty = qty_span.get_text(strip=True) if qty_span else ""
-                    
-                    if ing_name:
-                        query_ing = """
-                        MATCH (r:Recipe {slug: $slug})
-                        MERGE (i:Ingredient {name: $name})
-                        MERGE (r)-[rel:CONTAINS]->(i)
-                        SET rel.quantity = $qty
-                        """
-                        tx.run(query_ing, slug=item.get('slug'), name=ing_name, qty=ing_qty)
+    @classmethod
+    async def _save_batch_async(cls, tx, batch):
+        for query in cls.batch_queries:
+            await tx.run(query, batch=batch)
@@ -0,0 +1,155 @@
+import re
+import unicodedata
+
+# Parser ilości i jednostek w zapisie polskim ("2 łyżki", "200 g", "1/2 szklanki", "2-3 ząbki").
+# Używany przy zapisie przepisów do bazy i przy normalizacji produktów na listę zakupów.
+
+# Jednostka kanoniczna -> (jednostka bazowa, mnożnik); miary kuchenne przeliczane na ml
+UNITS = {
+    "g": ("g", 1),
+    "dag": ("g", 10),
+    "kg": ("g", 1000),
+    "ml": ("ml", 1),
+    "l": ("ml", 1000),
+    "łyżeczka": ("ml", 5),
+    "łyżka": ("ml", 15),
+    "szklanka": ("ml", 250),
+    "szt": ("szt", 1),
+    "opak.": ("opak.", 1),
+    "szczypta": ("szczypta", 1),
+    "ząbek": ("ząbek", 1),
+    "plaster": ("plaster", 1),
+    "garść": ("garść", 1),
+    "pęczek": ("pęczek", 1),
+    "puszka": ("puszka", 1),
+    "kostka": ("kostka", 1),
+}
+
+UNIT_FORMS = {
+    "g": ["g", "gr", "gram", "gramy", "gramów"],
+    "dag": ["dag", "dkg", "deko"],
+    "kg": ["kg", "kilogram", "kilogramy", "kilogramów"],
+    "ml": ["ml", "mililitr", "mililitry", "mililitrów"],
+    "l": ["l", "litr", "litra", "litry", "litrów"],
+    "łyżeczka": ["łyżeczka", "łyżeczki", "łyżeczek", "łyżeczkę", "łyżeczką", "łyżecz"],
+    "łyżka": ["łyżka", "łyżki", "łyżek", "łyżkę", "łyżką", "łyż"],
+    "szklanka": ["szklanka", "szklanki", "szklanek", "szklankę", "szkl"],
+    "szt": ["szt", "sztuka", "sztuki", "sztuk", "sztukę"],
+    "opak.": ["opak", "op", "opakowanie", "opakowania", "opakowań"],
+    "szczypta": ["szczypta", "szczypty", "szczypt", "szczyptę"],
+    "ząbek": ["ząbek", "ząbki", "ząbków", "ząbka"],
+    "plaster": ["plaster", "plastry", "plastrów", "plasterek", "plasterki", "plasterków"],
+    "garść": ["garść", "garści"],
+    "pęczek": ["pęczek", "pęczki", "pęczków", "pęczka"],
+    "puszka": ["puszka", "puszki", "puszek", "puszkę"],
+    "kostka": ["kostka", "kostki", "kostek", "kostkę"],
+}
+UNIT_ALIASES = {form: unit for unit, forms in UNIT_FORMS.items() for form in forms}
+
+WORD_AMOUNTS = {"pół": 0.5, "półtora": 1.5, "półtorej": 1.5, "ćwierć": 0.25}
+VULGAR_FRACTIONS = "½⅓⅔¼¾⅕⅛"
+NUMBER = r"\d+(?:[.,]\d+)?"
+# Pojedyncza liczba: ułamek ("1/2", "1 1/2"), ułamek zwykły ("½", "1 ½") albo liczba dziesiętna
+SINGLE_AMOUNT = (
+    rf"(?:\d+\s+)?\d+\s*/\s*\d+"
+    rf"|\d*\s*[{VULGAR_FRACTIONS}]"
+    rf"|{NUMBER}"
+)
+AMOUNT = (
+    rf"(?:{SINGLE_AMOUNT})(?:\s*[-–]\s*(?:{SINGLE_AMOUNT}))?"
+    rf"|{'|'.join(sorted(WORD_AMOUNTS, key=len, reverse=True))}"
+)
+# "ok. 200 g", "około 2 łyżek" - przybliżenie nie zmienia ilości
+APPROX = rf"(?:(?:około|ok|ca)\.?\s*(?=[\d{VULGAR_FRACTIONS}]))?"
+UNIT_WORD = r"[^\W\d_]+\.?"
+AMOUNT_RE = re.compile(rf"^\s*{APPROX}(?P<amount>{AMOUNT})\s*(?P<rest>.*)$", re.IGNORECASE)
+LEADING_UNIT_RE = re.compile(rf"^\s*{APPROX}(?P<amount>{AMOUNT})\s*(?P<unit>{UNIT_WORD})(?=\s|$)\s*(?P<rest>.*)$", re.IGNORECASE)
+LEADING_NUMBER_RE = re.compile(rf"^\s*{APPROX}(?P<amount>{AMOUNT})(?![^\W\d_])\s*(?P<rest>.+)$", re.IGNORECASE)
+TRAILING_RE = re.compile(rf"^(?P<rest>.*?\S)\s+{APPROX}(?P<amount>{AMOUNT})\s*(?P<unit>{UNIT_WORD})?\s*$", re.IGNORECASE)
+
+
+def parse_amount(text):
+    """
+    Zamienia zapis ilości na liczbę; przy zakresie ("2-3", "1/2-1") zwraca górną granicę.
+    Niepoprawny zapis ("1/0") kończy się ValueError albo ZeroDivisionError.
+    """
+    text = unicodedata.normalize("NFC", text).strip().lower().replace(",", ".")
+    text = re.sub(r"\s*/\s*", "/", text)
+    if text in WORD_AMOUNTS:
+        return WORD_AMOUNTS[text]
+    if "-" in text or "–" in text:
+        return max(parse_amount(part) for part in re.split(r"[-–]", text))
+    total = 0.0
+    for part in text.split():
+        if "/" in part:
+            numerator, denominator = part.split("/")
+            total += float(numerator) / float(denominator)
+        elif part and part[-1] in VULGAR_FRACTIONS:
+            total += (float(part[:-1]) if part[:-1] else 0.0) + unicodedata.numeric(part[-1])
+        else:
+            total += float(part)
+    return total
+
+
+def parse_unit(text):
+    if not text:
+        return None
+    word = unicodedata.normalize("NFC", text).strip().lower()
+    return UNIT_ALIASES.get(word) or UNIT_ALIASES.get(word.rstrip("."))
+
+
+def to_base(amount, unit):
+    """Przelicza ilość na jednostkę bazową (g, ml lub jednostkę niemierzalną); bez jednostki - sztuki."""
+    if amount is None:
+        return None, None
+    base_unit, factor = UNITS.get(unit or "szt", (unit, 1))
+    return amount * factor, base_unit
+
+
+def _unknown(raw):
+    return {"amount": None, "unit": None, "raw": raw, "base_amount": None, "base_unit": None}
+
+
+def _quantity(amount_text, unit_text, raw):
+    try:
+        amount = parse_amount(amount_text)
+    except (ValueError, ZeroDivisionError):
+        return _unknown(raw)
+    unit = parse_unit(unit_text)
+    base_amount, base_unit = to_base(amount, unit)
+    return {"amount": amount, "unit": unit, "raw": raw, "base_amount": base_amount, "base_unit": base_unit}
+
+
+def parse_quantity(raw):
+    """
+    "2 łyżki" -> {"amount": 2.0, "unit": "łyżka", "raw": "2 łyżki", "base_amount": 30.0, "base_unit": "ml"}.
+    Gdy nie da się odczytać liczby, amount/unit/base_* są None, a raw zostaje bez zmian - funkcja nie zgłasza wyjątków.
+    """
+    raw = " ".join((raw or "").split())
+    if parse_unit(raw):
+        # Sama jednostka ("szczypta") oznacza jedną
+        return _quantity("1", raw, raw)
+    match = AMOUNT_RE.match(raw)
+    if not match:
+        return _unknown(raw)
+    # Słowo po liczbie, które nie jest jednostką (np. "2 duże"), jest pomijane
+    words = match.group("rest").split()
+    return _quantity(match.group("amount"), words[0] if words else None, raw)
+
+
+def split_ingredient(text):
+    """
+    Rozdziela opis produktu na nazwę i ilość: "2 łyżki cukru", "cukier 200 g", "2 jajka", "mleko".
+    Zwraca (nazwa, ilość) - ilość jak w parse_quantity albo None, gdy nie podano.
+    """
+    text = " ".join((text or "").split())
+    match = LEADING_UNIT_RE.match(text)
+    if match and match.group("rest") and parse_unit(match.group("unit")):
+        return match.group("rest"), _quantity(match.group("amount"), match.group("unit"), text)
+    match = TRAILING_RE.match(text)
+    if match and (match.group("unit") is None or parse_unit(match.group("unit"))):
+        return match.group("rest"), _quantity(match.group("amount"), match.group("unit"), text)
+    match = LEADING_NUMBER_RE.match(text)
+    if match:
+        return match.group("rest"), _quantity(match.group("amount"), None, text)
+    return text, None
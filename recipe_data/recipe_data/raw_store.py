@@ -0,0 +1,52 @@
+import glob
+import gzip
+import hashlib
+import json
+import os
+
+DEFAULT_RAW_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "raw_responses")
+
+
+class RawResponseStore:
+    """Surowe odpowiedzi API (gzip) zapisane po slugu, z indeksem slug -> sha256 treści."""
+
+    def __init__(self, directory=DEFAULT_RAW_STORE_DIR):
+        self.directory = directory
+        self.index_path = os.path.join(directory, "index.json")
+        os.makedirs(directory, exist_ok=True)
+        self.index = self.load_index()
+
+    def load_index(self):
+        if os.path.isfile(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {}
+
+    def save_index(self):
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def path_for(self, slug):
+        return os.path.join(self.directory, f"{slug}.json.gz")
+
+    def put(self, slug, body):
+        """Zapisuje odpowiedź; zwraca False, gdy identyczna treść już jest w magazynie."""
+        digest = hashlib.sha256(body).hexdigest()
+        if self.index.get(slug) == digest and os.path.isfile(self.path_for(slug)):
+            return False
+        tmp_path = f"{self.path_for(slug)}.tmp"
+        with gzip.open(tmp_path, "wb") as f:
+            f.write(body)
+        os.replace(tmp_path, self.path_for(slug))
+        self.index[slug] = digest
+        return True
+
+    def paths(self):
+        return sorted(glob.glob(os.path.join(self.directory, "*.json.gz")))
+
+
+def load_response(path):
+    with gzip.open(path, "rb") as f:
+        return json.loads(f.read())
@@ -1,13 +1,32 @@
+import asyncio
+import hashlib
 import json
 import os
-from xml.etree.ElementTree import indent
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
-from azure.ai.vision.imageanalysis import ImageAnalysisClient
-from azure.ai.vision.imageanalysis.models import VisualFeatures
-from azure.core.credentials import AzureKeyCredential
 from dotenv import load_dotenv
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import AzureChatOpenAI
+
+from recipe_data.recipe_data.list_blueprint.list_blueprint import ListBlueprint, data_path
+from recipe_data.recipe_data.tools.ingredient_normalizer import get_ingredient_normalizer
+from recipe_data.recipe_data.tools.event_loop import run as run_in_loop
+
+OCR_CACHE_PATH = data_path("ocr_cache.json")
+ITEM_CACHE_PATH = data_path("item_cache.json")
+# Od pierwszego nawiasu do ostatniego - odpowiedź modelu bywa opakowana w ```json ... ```
+JSON_RE = re.compile(r"[\[{].*[\]}]", re.S)
+
+# Klient OCR i LLM są tworzone przy pierwszym użyciu i współdzielone przez wszystkie instancje
+_client = None
+_llm = None
+_clients_lock = threading.Lock()
+_caches = {}
 
 
 def load_image_from_path_as_bytes(photo_path):
@@ -15,44 +34,305 @@ def load_image_from_path_as_bytes(photo_path):
         return  f.read()
 
 
-class PhotoReader:
+def get_vision_client():
+    global _client
+    with _clients_lock:
+        if _client is None:
+            load_dotenv(override=True)
+            endpoint = os.getenv("COGNITIVE_API")
+            key = os.getenv("COGNITIVE_KEY")
+            if not endpoint or not key:
+                raise RuntimeError("Missing environment variable 'COGNITIVE_API' or 'COGNITIVE_KEY'")
+            from azure.ai.vision.imageanalysis import ImageAnalysisClient
+            from azure.core.credentials import AzureKeyCredential
+
+            _client = ImageAnalysisClient(endpoint=endpoint, credential=AzureKeyCredential(key))
+        return _client
+
+
+def get_llm():
+    global _llm
+    with _clients_lock:
+        if _llm is None:
+            from langchain_openai import AzureChatOpenAI
+
+            load_dotenv(override=True)
+            _llm = AzureChatOpenAI(model="gpt-5-nano")
+        return _llm
+
+
+class PersistentLRU:
+    """Słownik LRU z limitem wpisów, zapisywany atomowo do pliku JSON."""
+
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        if os.path.isfile(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = OrderedDict(json.load(f))
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.entries
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key not in self.entries:
+                return default
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def put_many(self, values):
+        if not values:
+            return
+        with self.lock:
+            for key, value in values.items():
+                self.entries[key] = value
+                self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self.save()
+
+    def put(self, key, value):
+        self.put_many({key: value})
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(list(self.entries.items()), f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def _get_cache(path, max_entries):
+    with _clients_lock:
+        if path not in _caches:
+            _caches[path] = PersistentLRU(path, max_entries)
+        return _caches[path]
+
+
+def get_ocr_cache():
+    # Skrót zawartości zdjęcia -> linie tekstu z OCR
+    return _get_cache(OCR_CACHE_PATH, 500)
+
+
+def get_item_cache():
+    # Znormalizowana linia (np. "2 mleka") -> {ingredient, category, quantity, unit} albo None, gdy to nie produkt
+    return _get_cache(ITEM_CACHE_PATH, 5000)
+
+
+def normalize_line(line):
+    line = unicodedata.normalize("NFC", line or "").lower()
+    return " ".join(line.split()).strip(" -•*.,;:")
+
+
+def image_hash(image_bytes):
+    return hashlib.sha256(image_bytes).hexdigest()
 
-    try:
-        load_dotenv(override=True)
-        endpoint = os.getenv("COGNITIVE_API")
-        key = os.getenv("COGNITIVE_KEY")
-    except KeyError:
-        print("Missing environment variable 'VISION_ENDPOINT' or 'VISION_KEY'")
-        exit()
 
-    client = ImageAnalysisClient(
-        endpoint=endpoint,
-        credential=AzureKeyCredential(key)
-    )
+def parse_json(content):
+    match = JSON_RE.search(content)
+    return json.loads(match.group(0) if match else content, strict=False)
+
+
+def merge_items(item_lists):
+    """Łączy listy z wielu zdjęć - ten sam produkt (nazwa, jednostka) występuje raz, z sumą ilości."""
+    merged = {}
+    for items in item_lists:
+        for item in items:
+            key = ListBlueprint.key_for(item)
+            if key in merged:
+                merged[key]["quantity"] += item.get("quantity", 1)
+            else:
+                merged[key] = dict(item)
+    return list(merged.values())
+
+
+class PhotoReader:
 
     prompt = ChatPromptTemplate.from_template("""Jesteś asystentem do planowania posiłków i wyszukiwania odpowiednich przepisów.
-                                              Dostaniesz listę zakupów, Twoim zadaniem jest pozbycie się tekstu, 
-                                              który nie jest produktem spożywczym, następnie
+                                              Dostaniesz ponumerowane linie listy zakupów, Twoim zadaniem jest pominięcie linii,
+                                              które nie są produktem spożywczym, następnie
                                               skategoryzowanie produktów, czyli dodasz kategorię z jakiej on pochodzi i ich ilości, 
                                               jeżeli nie ma przy składniku liczby sugerującej ilość, to domyślnie ustaw 1 
-                                              i zwrócenie ich w formacie json. 
+                                              i zwrócenie ich w formacie json: obiekt, w którym kluczem jest numer linii,
+                                              a wartością produkt albo null, jeżeli linia nie jest produktem spożywczym.
                                               Nie dodawaj żadnego dodatkowego tekstu w odpowiedzi, sam czysty json, żeby móc go sformatować. 
                                               Dodatkowo do kluczy w odpowiedzi json użyj angielskich nazw: ingredient, category, quantity, unit.
                                               Quantity powinno być liczbą (integer lub float). Unit powinno być jednostką (np. kg, g, l, szt, opakowanie). Jeśli brak jednostki, użyj "szt".
 
                                               Oto Twoja lista zakupów: {question}""")
 
+    @property
+    def client(self):
+        return get_vision_client()
+
+    @property
+    def llm(self):
+        return get_llm()
+
+    def __init__(self, ocr_cache=None, item_cache=None, normalizer=None, chunk_size=25, max_chunk_concurrency=4):
+        self.ocr_cache = ocr_cache if ocr_cache is not None else get_ocr_cache()
+        self.item_cache = item_cache if item_cache is not None else get_item_cache()
+        self.normalizer = normalizer if normalizer is not None else get_ingredient_normalizer()
+        # Długie listy są dzielone na fragmenty normalizowane równolegle
+        self.chunk_size = chunk_size
+        self.max_chunk_concurrency = max_chunk_concurrency
+        # Czasy etapów (s) ostatniego przetwarzania: ocr, llm, parse, total oraz liczba linii i zapytań do LLM
+        self.last_timings = {}
+        self.timings_lock = threading.Lock()
+
+    def _reset_timings(self):
+        with self.timings_lock:
+            self.last_timings = {"ocr": 0.0, "llm": 0.0, "parse": 0.0, "lines": 0, "llm_calls": 0}
+
+    def _count(self, name, value):
+        with self.timings_lock:
+            self.last_timings[name] = self.last_timings.get(name, 0) + value
+
+    @contextmanager
+    def _timed(self, stage):
+        # Przy równoległych fragmentach czasy się sumują (łączny czas pracy, nie czas zegarowy)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._count(stage, time.perf_counter() - start)
+
+    def read_lines(self, image_bytes):
+        digest = image_hash(image_bytes)
+        lines = self.ocr_cache.get(digest)
+        if lines is None:
+            from azure.ai.vision.imageanalysis.models import VisualFeatures
+
+            with self._timed("ocr"):
+                result = self.client.analyze(
+                    image_data=image_bytes,
+                    visual_features=[VisualFeatures.READ],
+                )
+            # Wszystkie bloki tekstu, w kolejności z OCR
+            lines = [line.text for block in result.read.blocks for line in block.lines]
+            self.ocr_cache.put(digest, lines)
+        self._count("lines", len(lines))
+        return lines
+
+    def _missing_lines(self, lines):
+        keys = [normalize_line(line) for line in lines]
+        missing = list(dict.fromkeys(key for key in keys if key and key not in self.item_cache))
+        # Linie ze składnikiem z bazy nie trafiają do LLM; pozostałe przechodzą przez filtr produktów niespożywczych
+        known = {}
+        for line in missing:
+            item = self.normalizer.normalize(line, known_only=True)
+            if item is not None:
+                known[line] = item
+        self.item_cache.put_many(known)
+        return keys, [line for line in missing if line not in known]
+
+    def _format_question(self, missing):
+        return self.prompt.format(question="\n".join(f"{number}. {line}" for number, line in enumerate(missing, start=1)))
+
+    def _chunks(self, missing):
+        return [missing[i:i + self.chunk_size] for i in range(0, len(missing), self.chunk_size)]
+
+    def _learn(self, missing, content):
+        with self._timed("parse"):
+            data = parse_json(content)
+            if not isinstance(data, dict):
+                # Bez kluczy z numerami linii nic nie trafiłoby do cache, a każde kolejne zdjęcie znów pytałoby LLM
+                raise ValueError(f"Expected a JSON object keyed by line number, got {type(data).__name__}")
+            # Linie pominięte przez model (albo z odpowiedzią, która nie jest produktem ani null)
+            # nie trafiają do cache - zostaną ponowione następnym razem
+            items = {
+                line: data[str(number)] for number, line in enumerate(missing, start=1)
+                if str(number) in data and (data[str(number)] is None or isinstance(data[str(number)], dict))
+            }
+            if len(items) < len(missing):
+                print(f"Photo reader: model answered {len(items)} of {len(missing)} lines")
+            self.item_cache.put_many(items)
+        for line, item in items.items():
+            self.normalizer.learn(line, item)
+
+    def _normalize_chunk(self, chunk):
+        with self._timed("llm"):
+            response = self.llm.invoke(self._format_question(chunk))
+        self._count("llm_calls", 1)
+        self._learn(chunk, response.content)
+
+    async def _anormalize_chunk(self, chunk, semaphore):
+        async with semaphore:
+            with self._timed("llm"):
+                response = await self.llm.ainvoke(self._format_question(chunk))
+        self._count("llm_calls", 1)
+        self._learn(chunk, response.content)
+
+    def _cached_items(self, keys):
+        items = []
+        for key in keys:
+            item = self.item_cache.get(key)
+            if item:
+                items.append(dict(item))
+        return items
+
+    def normalize_lines(self, lines):
+        """Zamienia linie z OCR na produkty; do LLM trafiają tylko linie, których nie ma jeszcze w cache."""
+        keys, missing = self._missing_lines(lines)
+        chunks = self._chunks(missing)
+        if len(chunks) == 1:
+            self._normalize_chunk(chunks[0])
+        elif chunks:
+            with ThreadPoolExecutor(max_workers=self.max_chunk_concurrency) as executor:
+                list(executor.map(self._normalize_chunk, chunks))
+        # Wynik budowany z cache w kolejności linii, niezależnie od kolejności odpowiedzi
+        return self._cached_items(keys)
+
+    async def anormalize_lines(self, lines):
+        keys, missing = self._missing_lines(lines)
+        semaphore = asyncio.Semaphore(self.max_chunk_concurrency)
+        await asyncio.gather(*(self._anormalize_chunk(chunk, semaphore) for chunk in self._chunks(missing)))
+        return self._cached_items(keys)
+
+    def get_list_from_bytes(self, image_bytes):
+        self._reset_timings()
+        with self._timed("total"):
+            return self.normalize_lines(self.read_lines(image_bytes))
+
     def get_list_from_photo_path(self, photo_path):
-        llm = AzureChatOpenAI(model="gpt-5-nano")
+        return self.get_list_from_bytes(load_image_from_path_as_bytes(photo_path))
+
+    async def aget_list_from_bytes(self, image_bytes):
+        # Klient OCR jest synchroniczny - wywołanie w wątku nie blokuje pętli
+        lines = await asyncio.to_thread(self.read_lines, image_bytes)
+        return await self.anormalize_lines(lines)
+
+    async def aget_list_from_images(self, images, max_concurrency=4):
+        """
+        Przetwarza wiele zdjęć równolegle (najwyżej max_concurrency naraz) i zwraca jedną,
+        połączoną listę produktów. Identyczne zdjęcia są przetwarzane raz, a błąd jednego
+        zdjęcia nie przerywa pozostałych.
+        """
+        self._reset_timings()
+        semaphore = asyncio.Semaphore(max_concurrency)
+        unique_images = list({image_hash(image): image for image in images}.values())
+
+        async def read(image_bytes):
+            async with semaphore:
+                return await self.aget_list_from_bytes(image_bytes)
 
-        result = self.client.analyze(
-            image_data=load_image_from_path_as_bytes(photo_path),
-            visual_features=[VisualFeatures.READ],
-        )
+        with self._timed("total"):
+            results = await asyncio.gather(*(read(image) for image in unique_images), return_exceptions=True)
+        item_lists = []
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"Photo processing failed: {result}")
+            else:
+                item_lists.append(result)
+        return merge_items(item_lists)
 
-        response = llm.invoke(self.prompt.format(question=result.read.blocks[0].lines))
-        data = json.loads(response.content.replace("`", "").replace("\n", "").replace("json", "").strip(), strict=False)
-        return data
+    def get_list_from_images(self, images, max_concurrency=4):
+        # Wspólna pętla zamiast asyncio.run() - asynchroniczny klient LLM jest związany z jedną pętlą
+        return run_in_loop(self.aget_list_from_images(images, max_concurrency=max_concurrency))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,56 @@
+import argparse
+import gzip
+import hashlib
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from recipe_data import settings
+from recipe_data.pipelines import IngredientParsingPipeline, RecipeDataPipeline
+from recipe_data.raw_store import DEFAULT_RAW_STORE_DIR, RawResponseStore
+from recipe_data.schema import ensure_schema, report_schema
+
+
+def read_item(path):
+    # Dekompresja, JSON i parsowanie składników - w procesach roboczych
+    with gzip.open(path, "rb") as f:
+        raw = f.read()
+    digest = hashlib.sha256(raw).hexdigest()
+    item = IngredientParsingPipeline().process_item(json.loads(raw), None)
+    item.pop('body', None)
+    return digest, item
+
+
+def replay(store_dir, workers=4, batch_size=None, uri=None):
+    """Wczytuje zapisane odpowiedzi API do Neo4j przez RecipeDataPipeline, bez sieci."""
+    store = RawResponseStore(store_dir)
+    pipeline = RecipeDataPipeline(
+        uri=uri or getattr(settings, "NEO4J_URI", "bolt://localhost:7687"),
+        batch_size=batch_size or getattr(settings, "NEO4J_BATCH_SIZE", 1),
+    )
+    report_schema(*ensure_schema(pipeline.driver))
+
+    seen_digests = set()
+    replayed = duplicates = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for digest, item in executor.map(read_item, store.paths(), chunksize=32):
+            if digest in seen_digests:
+                duplicates += 1
+                continue
+            seen_digests.add(digest)
+            pipeline.process_item(item, None)
+            replayed += 1
+    pipeline.close_spider(None)
+    elapsed = time.perf_counter() - start
+    print(f"Replayed {replayed} recipes ({duplicates} duplicates skipped) in {elapsed:.2f}s")
+    return replayed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Odtwarza zapisane odpowiedzi API do bazy Neo4j")
+    parser.add_argument("store_dir", nargs="?", default=getattr(settings, "RAW_STORE_DIR", None) or DEFAULT_RAW_STORE_DIR)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+    replay(args.store_dir, workers=args.workers, batch_size=args.batch_size)
@@ -0,0 +1,71 @@
+import os
+
+from dotenv import load_dotenv
+from neo4j import GraphDatabase
+
+# Nazwa -> zapytanie tworzące. Wszystkie zapytania są idempotentne (IF NOT EXISTS).
+SCHEMA_STATEMENTS = {
+    "recipe_slug_unique": "CREATE CONSTRAINT recipe_slug_unique IF NOT EXISTS FOR (r:Recipe) REQUIRE r.slug IS UNIQUE",
+    "ingredient_name_unique": "CREATE CONSTRAINT ingredient_name_unique IF NOT EXISTS FOR (i:Ingredient) REQUIRE i.name IS UNIQUE",
+    "cuisine_name_unique": "CREATE CONSTRAINT cuisine_name_unique IF NOT EXISTS FOR (c:Cuisine) REQUIRE c.name IS UNIQUE",
+    "diet_name_unique": "CREATE CONSTRAINT diet_name_unique IF NOT EXISTS FOR (d:Diet) REQUIRE d.name IS UNIQUE",
+    "occasion_name_unique": "CREATE CONSTRAINT occasion_name_unique IF NOT EXISTS FOR (o:Occasion) REQUIRE o.name IS UNIQUE",
+    # Indeksy tekstowe obsługują CONTAINS / STARTS WITH generowane przez GraphRAG
+    "recipe_title_text": "CREATE TEXT INDEX recipe_title_text IF NOT EXISTS FOR (r:Recipe) ON (r.title)",
+    "ingredient_name_text": "CREATE TEXT INDEX ingredient_name_text IF NOT EXISTS FOR (i:Ingredient) ON (i.name)",
+    "recipe_title_fulltext": "CREATE FULLTEXT INDEX recipe_title_fulltext IF NOT EXISTS FOR (r:Recipe) ON EACH [r.title]",
+    "ingredient_name_fulltext": "CREATE FULLTEXT INDEX ingredient_name_fulltext IF NOT EXISTS FOR (i:Ingredient) ON EACH [i.name]",
+    # Wersja grafu dla cache odpowiedzi (najnowsze last_updated)
+    "recipe_last_updated": "CREATE RANGE INDEX recipe_last_updated IF NOT EXISTS FOR (r:Recipe) ON (r.last_updated)",
+}
+
+
+def _existing_schema_names(driver):
+    names = set()
+    for query in ("SHOW CONSTRAINTS YIELD name", "SHOW INDEXES YIELD name"):
+        records, _, _ = driver.execute_query(query)
+        names.update(record["name"] for record in records)
+    return names
+
+
+def ensure_schema(driver):
+    """Tworzy brakujące constrainty i indeksy, zwraca (istniejące, utworzone)."""
+    existing = _existing_schema_names(driver)
+    created = []
+    for name, query in SCHEMA_STATEMENTS.items():
+        if name in existing:
+            continue
+        driver.execute_query(query)
+        created.append(name)
+    return sorted(existing & SCHEMA_STATEMENTS.keys()), created
+
+
+async def _existing_schema_names_async(driver):
+    names = set()
+    for query in ("SHOW CONSTRAINTS YIELD name", "SHOW INDEXES YIELD name"):
+        records, _, _ = await driver.execute_query(query)
+        names.update(record["name"] for record in records)
+    return names
+
+
+async def ensure_schema_async(driver):
+    """Wersja ensure_schema dla AsyncDriver."""
+    existing = await _existing_schema_names_async(driver)
+    created = []
+    for name, query in SCHEMA_STATEMENTS.items():
+        if name in existing:
+            continue
+        await driver.execute_query(query)
+        created.append(name)
+    return sorted(existing & SCHEMA_STATEMENTS.keys()), created
+
+
+def report_schema(existing, created, log=print):
+    log(f"Neo4j schema: existing={existing or '-'} created={created or '-'}")
+
+
+if __name__ == "__main__":
+    load_dotenv(override=True)
+    uri = os.getenv("NEO4J_URI", "bolt://localhost:7687")
+    with GraphDatabase.driver(uri, auth=("neo4j", os.getenv("NEO4J_PASSWORD"))) as driver:
+        report_schema(*ensure_schema(driver))
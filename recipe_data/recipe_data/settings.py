@@ -62,6 +62,23 @@ DOWNLOAD_DELAY = 1
 #    "recipe_data.pipelines.RecipeDataPipeline": 300,
 #}
 
+# Neo4j connection used by the item pipelines
+NEO4J_URI = "bolt://localhost:7687"
+# Number of recipes buffered by RecipeDataPipeline and written with one
+# UNWIND transaction (1 = write every recipe immediately)
+NEO4J_BATCH_SIZE = 200
+# Maximum number of concurrent write transactions in AsyncRecipeDataPipeline
+NEO4J_MAX_INFLIGHT = 4
+
+# Directory for gzip-compressed raw API responses (None = disabled).
+# Stored responses can be re-ingested offline with: python -m recipe_data.replay
+RAW_STORE_DIR = None
+
+# Compute recipe embeddings for new or changed recipes when the crawl finishes
+# (otherwise run: python -m recipe_data.embeddings)
+EMBED_ON_CLOSE = False
+EMBEDDING_BATCH_SIZE = 64
+
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
 #AUTOTHROTTLE_ENABLED = True
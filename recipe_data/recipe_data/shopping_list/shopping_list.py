@@ -1,9 +1,6 @@
-from recipe_data.recipe_data.list_blueprint.list_blueprint import ListBlueprint
-import os
+from recipe_data.recipe_data.list_blueprint.list_blueprint import ListBlueprint, data_path
 
 
 class ShoppingList(ListBlueprint):
-    def __init__(self):
-        base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        data_path = os.path.join(base_path, "data", "shopping_list.json")
-        super().__init__(data_path)
+    def __init__(self, user_id=None):
+        super().__init__(data_path("shopping_list.json", user_id))
@@ -1,49 +1,137 @@
 import json
+import os
 
 from scrapy import Spider, Request
 
+from recipe_data.crawl_state import CrawlState, DEFAULT_STATE_PATH, listing_marker, recipes_stored
+from recipe_data.raw_store import RawResponseStore
+
+# Ten sam rozmiar strony dla wszystkich zapytań, żeby numery stron z totalPages się zgadzały
+PER_PAGE = 24
+SEARCH_URL = 'https://api.aniagotuje.pl/client/posts/search?perPage={per_page}&page={page}&sort=publish,desc'
+
 class AniaGotujeSpider(Spider):
     name = "aniagotuje_spider"
     allowed_domains = ["aniagotuje.pl"]
-    start_urls = ["https://api.aniagotuje.pl/client/posts/search?perPage=200&page=0&sort=publish,desc"]
+    start_urls = [SEARCH_URL.format(per_page=PER_PAGE, page=0)]
     custom_settings = {
         "AUTOTHROTTLE_ENABLED": True,
         "CONCURRENT_REQUESTS": 16,
         "CONCURRENT_REQUESTS_PER_DOMAIN": 8,
         "DOWNLOAD_DELAY": 0.2,
         "ITEM_PIPELINES": {
+            'recipe_data.pipelines.IngredientParsingPipeline': 200,
             'recipe_data.pipelines.RecipeDataPipeline': 300,
         },
     }
 
-    def __init__(self, name=None, **kwargs):
+    # scrapy crawl aniagotuje_spider -a incremental=1 [-a state_source=graph] [-a state_file=...] [-a raw_store=DIR]
+    def __init__(self, name=None, incremental=False, state_file=None, state_source="file", raw_store=None, **kwargs):
         super().__init__(name, **kwargs)
+        self.incremental = str(incremental).lower() in ("1", "true", "yes")
+        self.state_file = state_file or DEFAULT_STATE_PATH
+        self.state_source = state_source
+        self.state = None
+        self.seen_slugs = set()
+        self.raw_store_dir = raw_store
+        self.raw_store = None
+        # Stan pobranych przepisów czekający na zapis w bazie (slug -> marker, etag, last_modified)
+        self.pending_state = {}
 
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        if spider.state_source == "graph":
+            from dotenv import load_dotenv
+            from neo4j import GraphDatabase
+
+            load_dotenv(override=True)
+            uri = crawler.settings.get("NEO4J_URI", "bolt://localhost:7687")
+            with GraphDatabase.driver(uri, auth=("neo4j", os.getenv("NEO4J_PASSWORD"))) as driver:
+                spider.state = CrawlState.from_graph(driver, spider.state_file)
+        else:
+            spider.state = CrawlState(spider.state_file)
+        raw_store_dir = spider.raw_store_dir or crawler.settings.get("RAW_STORE_DIR")
+        if raw_store_dir:
+            spider.raw_store = RawResponseStore(raw_store_dir)
+        crawler.signals.connect(spider.recipes_stored, signal=recipes_stored)
+        return spider
 
     def parse(self, response):
         curr_page = response.meta.get('curr_page', 0)
         data = json.loads(response.text)
 
-
+        reached_known = False
         for recipie_info in data.get('content'):
             recipie_slug = recipie_info.get('slug')
-            recipe_url = f'https://api.aniagotuje.pl/client/post/{recipie_slug}'
-            yield Request(
-                recipe_url,
-                callback=self.parse_recipe,
-            )
+            if recipie_slug in self.seen_slugs:
+                continue
+            self.seen_slugs.add(recipie_slug)
+            marker = listing_marker(recipie_info)
+            if self.incremental and self.state.is_unchanged(recipie_slug, marker):
+                reached_known = True
+                continue
+            yield self.recipe_request(recipie_slug, marker)
+
+        # Wyniki są posortowane od najnowszych - dalsze strony zawierają już pobrane przepisy
+        if reached_known:
+            self.logger.info(f"Incremental crawl: reached already ingested recipes on page {curr_page}")
+            return
 
         max_page = data.get('totalPages')
-        if curr_page < max_page - 1:
-            next_page = curr_page + 1
-            next_page_url = self.get_next_page_url(next_page)
+        if self.incremental:
+            # Tryb przyrostowy musi iść strona po stronie, żeby móc się zatrzymać
+            if curr_page < max_page - 1:
+                yield self.page_request(curr_page + 1)
+        elif curr_page == 0:
+            # Wszystkie pozostałe strony listingu od razu - pobierają się równolegle
+            for next_page in range(1, max_page):
+                yield self.page_request(next_page)
 
-            yield Request(next_page_url, callback=self.parse, meta={'curr_page': next_page})
+    def page_request(self, page):
+        # Strony listingu mają pierwszeństwo, żeby szybko poznać cały katalog
+        return Request(self.get_next_page_url(page), callback=self.parse, meta={'curr_page': page}, priority=10)
 
+    def recipe_request(self, slug, marker=None):
+        # Zapytania warunkowe tylko w trybie przyrostowym - pełny crawl (np. po wyczyszczeniu bazy) pobiera wszystko
+        return Request(
+            f'https://api.aniagotuje.pl/client/post/{slug}',
+            callback=self.parse_recipe,
+            headers=self.state.conditional_headers(slug) if self.incremental else None,
+            meta={'slug': slug, 'marker': marker, 'handle_httpstatus_list': [304]},
+        )
 
     def parse_recipe(self, response):
+        slug = response.meta.get('slug')
+        if response.status == 304:
+            self.logger.debug(f"Recipe {slug} not modified")
+            return
         data = json.loads(response.text)
+        if self.raw_store:
+            self.raw_store.put(slug or data.get('slug'), response.body)
+        # Stan jest zapisywany dopiero po udanym zapisie do bazy (sygnał recipes_stored z pipeline)
+        self.pending_state[data.get('slug') or slug] = {
+            'marker': response.meta.get('marker') or listing_marker(data),
+            'etag': self._header(response, 'ETag'),
+            'last_modified': self._header(response, 'Last-Modified'),
+        }
         yield data
 
+    def recipes_stored(self, slugs):
+        for slug in slugs:
+            entry = self.pending_state.pop(slug, None)
+            if entry is not None:
+                self.state.update(slug, **entry)
+
+    def closed(self, reason):
+        self.state.save()
+        if self.raw_store:
+            self.raw_store.save_index()
+
+    @staticmethod
+    def _header(response, name):
+        value = response.headers.get(name)
+        return value.decode('latin-1') if value else None
+
     def get_next_page_url(self, curr_page):
-       return  f'https://api.aniagotuje.pl/client/posts/search?perPage=24&page={curr_page}&sort=publish,desc'
\ No newline at end of file
+        return SEARCH_URL.format(per_page=PER_PAGE, page=curr_page)
@@ -0,0 +1,103 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from recipe_data.recipe_data.tools.prompts import summary_prompt
+
+
+def approx_tokens(text):
+    # Przybliżenie wystarczające do pilnowania budżetu (~4 znaki na token)
+    return len(text) // 4 + 1
+
+
+def describe_list(content):
+    return ", ".join(
+        f"{item.get('ingredient', '')} {item.get('quantity', '')} {item.get('unit') or ''}".strip()
+        for item in content or []
+    ) or "pusta"
+
+
+class ChatHistory:
+    """
+    Historia rozmowy z limitem tokenów: ostatnie keep_turns tur dosłownie, starsze
+    streszczane w tle do jednego podsumowania. Stan lodówki (state_fn) jest dołączany
+    jako jedna zwięzła wiadomość systemowa zamiast powtarzać go w historii.
+    """
+
+    def __init__(self, llm, keep_turns=4, max_tokens=2000, max_message_chars=1500, state_fn=None):
+        self.llm = llm
+        self.keep_turns = keep_turns
+        self.max_tokens = max_tokens
+        self.max_message_chars = max_message_chars
+        self.state_fn = state_fn
+        self.turns = []
+        self.pending = []
+        self.summary = ""
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chat-summary")
+        self.future = None
+        # Zwiększane przez clear() - wynik streszczenia z poprzedniej rozmowy jest odrzucany
+        self.generation = 0
+
+    def _truncate(self, text):
+        if len(text) <= self.max_message_chars:
+            return text
+        return text[:self.max_message_chars] + " [...]"
+
+    def add_turn(self, human, ai):
+        with self.lock:
+            self.turns.append((HumanMessage(content=self._truncate(human)), AIMessage(content=self._truncate(ai))))
+            while len(self.turns) > self.keep_turns:
+                self.pending.append(self.turns.pop(0))
+            if self.pending and (self.future is None or self.future.done()):
+                self.future = self.executor.submit(self._summarize)
+
+    def _summarize(self):
+        with self.lock:
+            batch = list(self.pending)
+            summary = self.summary
+            generation = self.generation
+        if not batch:
+            return
+        messages = "\n".join(f"{message.type}: {message.content}" for turn in batch for message in turn)
+        try:
+            response = self.llm.invoke(summary_prompt.format(summary=summary or "brak", messages=messages))
+        except Exception as e:
+            print(f"Chat history summary failed: {e}")
+            return
+        with self.lock:
+            if generation == self.generation:
+                self.summary = response.content.strip()
+                self.pending = self.pending[len(batch):]
+            # Tury dodane po clear() w trakcie streszczania czekają na kolejne wywołanie
+            if self.pending:
+                self.future = self.executor.submit(self._summarize)
+
+    def messages(self):
+        with self.lock:
+            summary = self.summary
+            turns = self.pending + self.turns
+        header = []
+        if summary:
+            header.append(SystemMessage(content=f"Podsumowanie wcześniejszej rozmowy: {summary}"))
+        if self.state_fn is not None:
+            header.append(SystemMessage(content=f"Aktualny stan lodówki: {self.state_fn()}"))
+
+        # Od najnowszych tur wstecz, dopóki mieszczą się w budżecie
+        budget = self.max_tokens - sum(approx_tokens(message.content) for message in header)
+        kept = []
+        for turn in reversed(turns):
+            cost = sum(approx_tokens(message.content) for message in turn)
+            if cost > budget and kept:
+                break
+            budget -= cost
+            kept.insert(0, turn)
+        return header + [message for turn in kept for message in turn]
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.turns = []
+            self.pending = []
+            self.summary = ""
@@ -1,11 +1,16 @@
+import queue
+import threading
+
 from langchain_classic.agents import create_tool_calling_agent, AgentExecutor
-from langchain_core.messages import HumanMessage, AIMessage
 
-from recipe_data.recipe_data.tools.common import llm
+from recipe_data.recipe_data.tools.chat_history import ChatHistory, describe_list
+from recipe_data.recipe_data.tools.common import llm, get_fridge, get_user_lists, bind_user_lists, user_lists
 from recipe_data.recipe_data.tools.prompts import prompt
 from recipe_data.recipe_data.tools.fridge_tools import read_fridge, add_ingredient_to_fridge, remove_ingredient_from_fridge
 from recipe_data.recipe_data.tools.shopping_list_tools import read_shopping_list, add_ingredient_to_shopping_list, add_missing_ingredients_for_recipe, create_shopping_list_file_for_recipe
-from recipe_data.recipe_data.tools.rag_tools import get_graph_rag_tool, get_vector_rag_tool
+from recipe_data.recipe_data.tools.rag_tools import get_graph_rag_tool, get_vector_rag_tool, get_graph_version
+from recipe_data.recipe_data.tools.response_cache import cached_tool, fridge_fingerprint, get_response_cache
+from recipe_data.recipe_data.tools.event_loop import submit
 
 base_tools = [
     read_fridge, 
@@ -17,40 +22,154 @@ base_tools = [
     create_shopping_list_file_for_recipe
 ]
 
+RAG_TOOL_FACTORIES = {
+    "Graph RAG": get_graph_rag_tool,
+    "RAG": get_vector_rag_tool,
+}
+
+# Narzędzia RAG i AgentExecutory są budowane raz na proces i współdzielone przez wszystkie
+# instancje chatbota - historia rozmowy jest przekazywana przy każdym wywołaniu.
+_rag_tools = {}
+_executors = {}
+_build_locks = {}
+_build_locks_guard = threading.Lock()
+
+def _build_lock(key):
+    with _build_locks_guard:
+        return _build_locks.setdefault(key, threading.Lock())
+
+def _with_cache(tool):
+    # Odpowiedź zależy od pytania i zawartości lodówki; ponowne zasilenie bazy czyści cache
+    return cached_tool(
+        tool,
+        get_response_cache(),
+        context_fn=lambda: fridge_fingerprint(get_fridge().content),
+        version_fn=get_graph_version,
+    )
+
+def get_rag_tool(rag_type):
+    with _build_lock(("tool", rag_type)):
+        if _rag_tools.get(rag_type) is None:
+            tool = RAG_TOOL_FACTORIES[rag_type]()
+            # Nieudana inicjalizacja (np. baza niedostępna) nie jest zapamiętywana
+            _rag_tools[rag_type] = _with_cache(tool) if tool else None
+        return _rag_tools[rag_type]
+
+def get_agent_executor(tools):
+    key = tuple(t.name for t in tools)
+    with _build_lock(("executor", key)):
+        if key not in _executors:
+            agent = create_tool_calling_agent(llm, tools, prompt=prompt)
+            _executors[key] = AgentExecutor(agent=agent, tools=tools, verbose=True)
+        return _executors[key]
+
+def tools_for(use_neo4j=False, rag_type="Graph RAG"):
+    current_tools = base_tools.copy()
+    if use_neo4j and rag_type in RAG_TOOL_FACTORIES:
+        tool = get_rag_tool(rag_type)
+        if tool:
+            current_tools.append(tool)
+    return current_tools
+
+def warm_up(rag_types=tuple(RAG_TOOL_FACTORIES)):
+    """Buduje w tle narzędzia RAG i executory dla wszystkich trybów, żeby przełączanie było natychmiastowe."""
+    def run():
+        get_agent_executor(base_tools)
+        for rag_type in rag_types:
+            try:
+                get_agent_executor(tools_for(use_neo4j=True, rag_type=rag_type))
+            except Exception as e:
+                print(f"Warm-up of {rag_type} failed: {e}")
+
+    thread = threading.Thread(target=run, name="chatbot-warm-up", daemon=True)
+    thread.start()
+    return thread
+
 class FridgeChatbot:
-    def __init__(self, tools=None):
+    def __init__(self, tools=None, fridge=None, shopping_list=None):
+        # Bez podanych list chatbot działa na domyślnym użytkowniku
+        default_fridge, default_shopping_list = get_user_lists()
+        self.fridge = fridge if fridge is not None else default_fridge
+        self.shopping_list = shopping_list if shopping_list is not None else default_shopping_list
         self.tools = tools if tools else base_tools
-        agent = create_tool_calling_agent(llm, self.tools, prompt=prompt)
-        self.agent_executor = AgentExecutor(agent=agent, tools=self.tools, verbose=True)
-        self.chat_history = []
+        self.agent_executor = get_agent_executor(self.tools)
+        self.chat_history = ChatHistory(llm, state_fn=lambda: describe_list(self.fridge.content))
 
     def chat(self, message: str) -> str:
-        result = self.agent_executor.invoke({
-            "input": message,
-            "chat_history": self.chat_history
-        })
-        self.chat_history.extend([HumanMessage(content=message), AIMessage(content=result["output"])])
+        with user_lists(self.fridge, self.shopping_list):
+            result = self.agent_executor.invoke({
+                "input": message,
+                "chat_history": self.chat_history.messages()
+            })
+        self.chat_history.add_turn(message, result["output"])
         return result["output"]
 
+    async def astream(self, message: str):
+        """
+        Strumień zdarzeń z jednego przebiegu agenta:
+        {"type": "tool_start" | "tool_end" | "token" | "final", ...}.
+        Tokeny pochodzą tylko z LLM agenta - wywołania LLM wewnątrz narzędzi są pomijane.
+        """
+        # Zadania agenta kopiują bieżący kontekst przy starcie, więc wystarczy ustawić listy
+        # przed pierwszym zdarzeniem (reset nie jest możliwy - generator wznawiany jest w różnych kontekstach)
+        bind_user_lists(self.fridge, self.shopping_list)
+        active_tools = set()
+        output = None
+        async for event in self.agent_executor.astream_events(
+            {"input": message, "chat_history": self.chat_history.messages()}, version="v2"
+        ):
+            kind = event["event"]
+            if kind == "on_tool_start":
+                active_tools.add(event["run_id"])
+                yield {"type": "tool_start", "name": event["name"], "input": event["data"].get("input")}
+            elif kind == "on_tool_end":
+                active_tools.discard(event["run_id"])
+                yield {"type": "tool_end", "name": event["name"], "output": str(event["data"].get("output", ""))}
+            elif kind == "on_chat_model_stream" and not active_tools.intersection(event.get("parent_ids", [])):
+                content = event["data"]["chunk"].content
+                if isinstance(content, list):
+                    content = "".join(part.get("text", "") for part in content if isinstance(part, dict))
+                if content:
+                    yield {"type": "token", "content": content}
+            elif kind == "on_chain_end" and not event.get("parent_ids") and isinstance(event["data"].get("output"), dict):
+                output = event["data"]["output"].get("output")
+
+        self.chat_history.add_turn(message, output or "")
+        yield {"type": "final", "output": output or ""}
+
+    def stream(self, message: str):
+        # Synchroniczna wersja astream dla Streamlita (st.write_stream). Cały przebieg agenta
+        # działa jako jedno zadanie we wspólnej pętli, a zdarzenia są przekazywane przez kolejkę.
+        events = queue.Queue()
+        done = object()
+
+        async def pump():
+            try:
+                async for event in self.astream(message):
+                    events.put(event)
+            finally:
+                events.put(done)
+
+        future = submit(pump())
+        try:
+            while True:
+                event = events.get()
+                if event is done:
+                    break
+                yield event
+            future.result()
+        finally:
+            if not future.done():
+                future.cancel()
+
     def update_tools(self, use_neo4j=False, rag_type="Graph RAG"):
-        current_tools = base_tools.copy()
-        if use_neo4j:
-            if rag_type == "Graph RAG":
-                tool = get_graph_rag_tool()
-                if tool:
-                    current_tools.append(tool)
-            elif rag_type == "RAG":
-                tool = get_vector_rag_tool()
-                if tool:
-                    current_tools.append(tool)
-        
+        current_tools = tools_for(use_neo4j=use_neo4j, rag_type=rag_type)
         print(f"Active tools: {[t.name for t in current_tools]}")
         self.tools = current_tools
-        agent = create_tool_calling_agent(llm, self.tools, prompt=prompt)
-        self.agent_executor = AgentExecutor(agent=agent, tools=self.tools, verbose=True)
+        self.agent_executor = get_agent_executor(self.tools)
     
     def clear_history(self):
-        self.chat_history = []
+        self.chat_history.clear()
 
 
 if __name__ == "__main__":
@@ -1,9 +1,64 @@
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
 from dotenv import load_dotenv
 from langchain_openai import AzureChatOpenAI
 from recipe_data.recipe_data.fridge.fridge import Fridge
+from recipe_data.recipe_data.list_blueprint.list_blueprint import data_path, validate_user_id
+from recipe_data.recipe_data.list_blueprint.sqlite_store import SQLiteListBlueprint, DEFAULT_DB_PATH
 from recipe_data.recipe_data.shopping_list.shopping_list import ShoppingList
 
 load_dotenv(override=True)
+# Ciężkie klienty są współdzielone przez wszystkie sesje w procesie
 llm = AzureChatOpenAI(model="gpt-5-nano")
-fridge = Fridge()
-shopping_list = ShoppingList()
+
+# Lodówka i lista zakupów są per użytkownik (user_id=None to domyślne pliki w data/).
+# Jeden obiekt na użytkownika w procesie, więc wszystkie jego sesje widzą te same dane.
+_user_lists = {}
+_user_lists_lock = threading.Lock()
+
+current_fridge = ContextVar("current_fridge", default=None)
+current_shopping_list = ContextVar("current_shopping_list", default=None)
+
+
+def _create_user_lists(user_id):
+    # LIST_BACKEND=sqlite: wszyscy użytkownicy w jednej bazie data/lists.db, dane z JSON przenoszone przy pierwszym użyciu
+    if os.getenv("LIST_BACKEND", "json") == "sqlite":
+        return (
+            SQLiteListBlueprint(DEFAULT_DB_PATH, "fridge", user_id, json_path=data_path("fridge.json", user_id)),
+            SQLiteListBlueprint(DEFAULT_DB_PATH, "shopping_list", user_id, json_path=data_path("shopping_list.json", user_id)),
+        )
+    return Fridge(user_id), ShoppingList(user_id)
+
+
+def get_user_lists(user_id=None):
+    validate_user_id(user_id)
+    with _user_lists_lock:
+        if user_id not in _user_lists:
+            _user_lists[user_id] = _create_user_lists(user_id)
+        return _user_lists[user_id]
+
+
+def get_fridge():
+    return current_fridge.get() or get_user_lists()[0]
+
+
+def get_shopping_list():
+    return current_shopping_list.get() or get_user_lists()[1]
+
+
+def bind_user_lists(fridge, shopping_list):
+    """Ustawia listy użytkownika dla narzędzi wywoływanych w bieżącym kontekście."""
+    return current_fridge.set(fridge), current_shopping_list.set(shopping_list)
+
+
+@contextmanager
+def user_lists(fridge, shopping_list):
+    fridge_token, shopping_list_token = bind_user_lists(fridge, shopping_list)
+    try:
+        yield
+    finally:
+        current_fridge.reset(fridge_token)
+        current_shopping_list.reset(shopping_list_token)
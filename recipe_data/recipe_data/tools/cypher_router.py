@@ -0,0 +1,148 @@
+import re
+
+from recipe_data.recipe_data.tools.polish_text import normalize_text, search_stem
+
+# Szybka ścieżka dla typowych pytań o przepisy: rozpoznaje okazję i listę składników
+# i wykonuje gotowe, sparametryzowane zapytanie Cypher bez generowania go przez LLM.
+# Pytania, których nie da się sklasyfikować, zwracają None i idą do GraphCypherQAChain.
+
+OCCASIONS = {
+    "śniad": "śniadani",
+    "obiad": "obiad",
+    "kolac": "kolacj",
+    "deser": "deser",
+    "przekąsk": "przekąsk",
+    "lunch": "lunch",
+    "imprez": "imprez",
+    "święt": "święt",
+    "wigil": "wigili",
+}
+# Pytania o dietę, kuchnię, czas itp. zostawiamy LLM-owi
+UNSUPPORTED_MARKERS = ("wegań", "wegan", "wegetar", "bezgluten", "kuchni", "diet", "kalor", "minut", "szybk", "bez ")
+INGREDIENTS_RE = re.compile(r"(?:\bze?\s|składnik\w*[:\s]|lodówce[:\s]|\bmam\s)(.+)$")
+# Rzeczownik przed "z"/"ze" to nazwa dania ("zupa z dyni", "ciasto z jabłkami") - filtr po tytule
+DISH_RE = re.compile(r"^(.*?)\bze?\s")
+SEPARATORS_RE = re.compile(r",|\bi\b|\boraz\b|\blub\b|\balbo\b")
+STOPWORDS = {
+    "na", "do", "dla", "w", "we", "co", "jakie", "jaki", "mam", "moje", "mojej", "tego", "lodówce", "lodówki",
+    "przepis", "przepisy", "przepisów", "przepisu", "danie", "dania", "potrawy", "potrawę", "zrobić", "ugotować",
+    "przygotować", "upiec", "mogę", "użyciem", "poleć", "pokaż", "znajdź", "podaj", "szukam", "chcę", "chciałbym",
+    "chciałabym", "coś", "jakieś", "jakiś", "jakąś", "mi", "proszę", "jak", "czy", "są", "jest", "macie", "masz",
+}
+RESULT_LIMIT = 10
+
+OCCASION_QUERY = """
+MATCH (r:Recipe)-[:PERFECT_FOR]->(o:Occasion)
+WHERE toLower(o.name) CONTAINS $occasion
+WITH DISTINCT r
+OPTIONAL MATCH (r)-[:CONTAINS]->(i:Ingredient)
+RETURN r.title AS title, r.url AS url, collect(i.name) AS ingredients
+LIMIT $limit
+"""
+
+INGREDIENTS_QUERY = """
+{occasion_match}
+{dish_match}
+MATCH (r)-[:CONTAINS]->(i:Ingredient)
+WITH r, collect(i.name) AS recipe_ingredients
+WITH r, recipe_ingredients,
+     [term IN $terms WHERE any(ing IN recipe_ingredients WHERE all(w IN term WHERE toLower(ing) CONTAINS w))] AS matched
+WHERE size(matched) > 0
+RETURN r.title AS title, r.url AS url, size(matched) AS match_count, matched AS matched_terms,
+       [ing IN recipe_ingredients WHERE none(term IN $terms WHERE all(w IN term WHERE toLower(ing) CONTAINS w))] AS missing_ingredients
+ORDER BY match_count DESC, size(missing_ingredients) ASC
+LIMIT $limit
+"""
+OCCASION_MATCH = """
+MATCH (r:Recipe)-[:PERFECT_FOR]->(o:Occasion)
+WHERE toLower(o.name) CONTAINS $occasion
+WITH DISTINCT r
+"""
+DISH_MATCH = "WITH r WHERE toLower(r.title) CONTAINS $dish"
+
+
+def _find_occasion(text):
+    for marker, occasion in OCCASIONS.items():
+        if marker in text:
+            return occasion
+    return None
+
+
+def _find_ingredient_terms(question):
+    # Szukamy na tekście z interpunkcją - przecinki rozdzielają składniki
+    match = INGREDIENTS_RE.search(question.lower())
+    if not match:
+        return []
+    terms = []
+    for part in SEPARATORS_RE.split(match.group(1)):
+        words = [
+            w for w in normalize_text(part).split()
+            if w not in STOPWORDS and not w.startswith("składnik") and not _find_occasion(w)
+        ]
+        term = [search_stem(w) for w in words]
+        if term and term not in terms:
+            terms.append(term)
+    return terms
+
+
+def _find_dish(question):
+    """
+    Rdzeń nazwy dania przed "z"/"ze" albo None, gdy przed nim są same słowa pytające.
+    Więcej niż jedno słowo ("szybka zupa z dyni") - zwraca False, takie pytanie obsłuży LLM.
+    """
+    match = DISH_RE.search(question.lower())
+    if not match:
+        return None
+    words = [w for w in normalize_text(match.group(1)).split() if w not in STOPWORDS and not _find_occasion(w)]
+    if not words:
+        return None
+    if len(words) > 1:
+        return False
+    return search_stem(words[0])
+
+
+def route_question(question):
+    """Zwraca (zapytanie, parametry) dla rozpoznanego pytania albo None."""
+    text = normalize_text(question)
+    if any(marker in f"{text} " for marker in UNSUPPORTED_MARKERS):
+        return None
+    occasion = _find_occasion(text)
+    terms = _find_ingredient_terms(question)
+    if terms:
+        dish = _find_dish(question)
+        if dish is False:
+            return None
+        query = INGREDIENTS_QUERY.format(
+            occasion_match=OCCASION_MATCH if occasion else "MATCH (r:Recipe)",
+            dish_match=DISH_MATCH if dish else "",
+        )
+        params = {"terms": terms, "limit": RESULT_LIMIT}
+        if occasion:
+            params["occasion"] = occasion
+        if dish:
+            params["dish"] = dish
+        return query, params
+    if occasion:
+        return OCCASION_QUERY, {"occasion": occasion, "limit": RESULT_LIMIT}
+    return None
+
+
+def covers_terms(params, results):
+    """
+    Czy wyniki razem zawierają każdy składnik z pytania. Jeśli któregoś nie ma w żadnym przepisie
+    (np. nierozpoznana odmiana), odpowiedź zignorowałaby ten warunek - pytanie powinien obsłużyć LLM.
+    """
+    found = {tuple(term) for row in results for term in row.get("matched_terms") or []}
+    return all(tuple(term) in found for term in params.get("terms", []))
+
+
+def format_results(results):
+    lines = ["Znalezione przepisy:"]
+    for number, row in enumerate(results, start=1):
+        line = f"{number}. {row['title']} - {row['url']}"
+        if "match_count" in row:
+            line += f" | pasujące składniki: {row['match_count']} | brakujące: {', '.join(row['missing_ingredients']) or 'brak'}"
+        else:
+            line += f" | składniki: {', '.join(row['ingredients'])}"
+        lines.append(line)
+    return "\n".join(lines)
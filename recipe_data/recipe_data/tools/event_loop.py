@@ -0,0 +1,27 @@
+import asyncio
+import threading
+
+# Jedna pętla zdarzeń na proces, w osobnym wątku. Współdzielone klienty (AzureChatOpenAI) trzymają
+# asynchronicznego klienta httpx związanego z pętlą, w której został użyty po raz pierwszy,
+# więc cały kod asynchroniczny wywoływany z synchronicznego (Streamlit) musi trafiać do tej samej pętli.
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="async-loop", daemon=True).start()
+        return _loop
+
+
+def submit(coroutine):
+    """Uruchamia coroutine we wspólnej pętli; zwraca concurrent.futures.Future."""
+    return asyncio.run_coroutine_threadsafe(coroutine, get_event_loop())
+
+
+def run(coroutine):
+    """Odpowiednik asyncio.run() dla wspólnej pętli - czeka na wynik w bieżącym wątku."""
+    return submit(coroutine).result()
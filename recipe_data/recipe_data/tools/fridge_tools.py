@@ -1,6 +1,6 @@
 import json
 from langchain_core.tools import tool
-from recipe_data.recipe_data.tools.common import llm, fridge
+from recipe_data.recipe_data.tools.common import llm, get_fridge
 from recipe_data.recipe_data.tools.prompts import conversion_prompt
 
 @tool
@@ -13,7 +13,7 @@ def read_fridge() -> str:
     Returns:
         JSON z listą składników w lodówce.
     """
-    return json.dumps(fridge.content, ensure_ascii=False)
+    return json.dumps(get_fridge().refresh(), ensure_ascii=False)
 
 @tool
 def add_ingredient_to_fridge(ingredient_to_add: str, quantity: int, unit: str, category:str):
@@ -34,7 +34,7 @@ def add_ingredient_to_fridge(ingredient_to_add: str, quantity: int, unit: str, c
         "unit": unit,
         "category": category
     }
-    fridge.add_to_content(data)
+    get_fridge().add_to_content(data)
 
 @tool
 def remove_ingredient_from_fridge(ingredient_to_remove: str, quantity: int, unit:str):
@@ -53,4 +53,4 @@ def remove_ingredient_from_fridge(ingredient_to_remove: str, quantity: int, unit
         "quantity": quantity,
         "unit": unit,
     }
-    fridge.remove_from_content(data)
+    get_fridge().remove_from_content(data)
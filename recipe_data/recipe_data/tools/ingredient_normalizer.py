@@ -0,0 +1,202 @@
+import json
+import os
+import re
+import threading
+
+from recipe_data.recipe_data.quantities import split_ingredient
+from recipe_data.recipe_data.tools.polish_text import normalize_text, stems
+
+DEFAULT_CATEGORIES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "categories.json")
+
+INGREDIENT_NAMES_QUERY = "MATCH (i:Ingredient) RETURN i.name AS name"
+MOBILE_E_RE = re.compile(r"i?e(?=[^aeiouyąęó]$)")
+
+# Rzeczowniki (porównywane po całym rdzeniu, więc "mleka"/"mlekiem" pasują do "mleko", a "serwetki" do "ser" już nie).
+# Słownik obejmuje tylko nazwy jednowyrazowe i znane frazy - przy dodatkowych słowach ("olej silnikowy",
+# "sól do zmywarki") kategoria nie jest zgadywana, produkt trafia do LLM, a odpowiedź zapamiętywana jest w categories.json.
+CATEGORY_WORDS = {
+    "Nabiał": ["mleko", "ser", "twaróg", "twarogu", "jogurt", "kefir", "maślanka", "śmietana", "śmietanka", "masło",
+               "maśle", "jajko", "jajka", "jaja", "jajek", "mozzarella", "parmezan", "feta"],
+    "Warzywa": ["marchew", "marchewka", "ziemniak", "cebula", "czosnek", "pomidor", "ogórek", "papryka", "sałata",
+                "kapusta", "brokuł", "kalafior", "cukinia", "bakłażan", "szpinak", "seler", "pietruszka", "burak",
+                "buraczki", "dynia", "dyni", "fasola", "fasolka", "groch", "groszek", "kukurydza", "pieczarka",
+                "pieczarek", "grzyb", "rzodkiewka", "szczypiorek", "koperek", "rukola", "awokado", "soczewica",
+                "ciecierzyca", "jarmuż", "batat"],
+    "Owoce": ["jabłko", "jabłek", "gruszka", "gruszek", "banan", "truskawka", "truskawek", "malina", "borówka",
+              "borówek", "jagoda", "śliwka", "śliwek", "wiśnia", "czereśnia", "cytryna", "limonka", "pomarańcza",
+              "mandarynka", "mandarynek", "winogrono", "brzoskwinia", "morela", "ananas", "kiwi", "arbuz", "mango",
+              "rodzynki", "rodzynek", "żurawina", "daktyl"],
+    "Mięso": ["kurczak", "indyk", "wołowina", "wieprzowina", "schab", "boczek", "szynka", "kiełbasa", "kiełbasek",
+              "kiełbaska", "mięso", "udko", "udka", "udek", "udziec", "pierś", "piersi", "filet", "karkówka",
+              "łopatka", "mielone", "salami", "parówka", "parówek", "kaczka", "polędwica", "polędwiczka"],
+    "Ryby": ["łosoś", "łososia", "dorsz", "tuńczyk", "śledź", "śledzie", "makrela", "pstrąg", "krewetka",
+             "krewetek", "ryba"],
+    "Pieczywo": ["chleb", "bułka", "bułek", "bagietka", "tortilla", "pieczywo", "rogal", "rogalik", "grzanka"],
+    "Produkty sypkie": ["mąka", "cukier", "ryż", "kasza", "makaron", "płatki", "otręby", "drożdże", "drożdży",
+                        "skrobia", "kakao", "soda", "żelatyna", "mak"],
+    "Przyprawy": ["sól", "soli", "pieprz", "cynamon", "wanilia", "oregano", "bazylia", "tymianek", "rozmaryn",
+                  "kurkuma", "imbir", "kmin", "kminek", "majeranek", "curry", "chili", "ocet", "musztarda",
+                  "ketchup", "majonez", "sos"],
+    "Tłuszcze": ["olej", "oliwa", "smalec", "margaryna"],
+    "Napoje": ["sok", "woda", "kawa", "herbata", "wino", "piwo"],
+    "Słodycze": ["czekolada", "miód", "miodu", "dżem", "konfitura", "budyń", "galaretka", "ciastko", "ciastek",
+                 "herbatnik", "cukierek", "syrop"],
+    "Orzechy i nasiona": ["orzech", "orzechy", "migdał", "migdały", "słonecznik", "pestki", "sezam", "siemię",
+                          "chia", "nerkowiec", "nerkowce"],
+}
+CATEGORY_PHRASES = {
+    "Napoje": ["mleko kokosowe", "woda mineralna", "sok pomarańczowy", "sok jabłkowy"],
+    "Produkty sypkie": ["bułka tarta", "proszek do pieczenia", "cukier puder", "cukier waniliowy", "kasza manna",
+                        "płatki owsiane"],
+    "Przyprawy": ["liść laurowy", "liście laurowe", "ziele angielskie", "gałka muszkatołowa", "papryka słodka",
+                  "papryka ostra"],
+}
+
+
+def name_keys(name):
+    """Rdzenie nazwy, także z ruchomym "e" z mianownika: "cukier" -> {"cukier", "cukr"} ("cukru")."""
+    key = " ".join(stems(name))
+    return {key, " ".join(MOBILE_E_RE.sub("", word) for word in key.split())}
+
+
+_WORD_CATEGORIES = {key: category for category, words in CATEGORY_WORDS.items() for word in words for key in name_keys(word)}
+_PHRASE_CATEGORIES = {key: category for category, phrases in CATEGORY_PHRASES.items() for phrase in phrases for key in name_keys(phrase)}
+
+
+def _number(value):
+    return int(value) if float(value).is_integer() else value
+
+
+class IngredientNormalizer:
+    """
+    Zamienia opis produktu ("2 łyżki cukru", "mleko 1 l") na {ingredient, category, quantity, unit}
+    bez wywołania LLM: ilość i jednostka z parsera, nazwa z bazy składników (porównanie po rdzeniach),
+    kategoria ze słownika. Zwraca None dla produktów, których nie zna - wynik LLM dla nich
+    można dopisać przez learn().
+    """
+
+    def __init__(self, path=DEFAULT_CATEGORIES_PATH, names_fn=None):
+        self.path = path
+        self.names_fn = names_fn
+        self.lock = threading.Lock()
+        self.learned = {}
+        self.graph_names = None
+        if os.path.isfile(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.learned = json.load(f)
+
+    @staticmethod
+    def key(name):
+        return " ".join(stems(name))
+
+    @staticmethod
+    def graph_keys(name):
+        return name_keys(name)
+
+    def _graph_names(self):
+        # Nazwy składników z bazy wczytywane raz; niedostępna baza oznacza po prostu brak podpowiedzi
+        if self.graph_names is None:
+            names = []
+            if self.names_fn is not None:
+                try:
+                    names = self.names_fn()
+                except Exception as e:
+                    print(f"Ingredient names could not be loaded: {e}")
+            self.graph_names = {key: name for name in names if name for key in self.graph_keys(name)}
+        return self.graph_names
+
+    @staticmethod
+    def category_for(name, head_only=False):
+        """
+        Kategoria znanej frazy albo nazwy złożonej z samego rzeczownika; None, gdy nie ma pewności.
+        head_only=True ocenia tylko pierwsze słowo - dla nazw z bazy składników, które na pewno są jedzeniem.
+        """
+        keys = name_keys(name)
+        for key in keys:
+            if key in _PHRASE_CATEGORIES:
+                return _PHRASE_CATEGORIES[key]
+        words = normalize_text(name).split()
+        if not words or (len(words) > 1 and not head_only):
+            return None
+        for key in name_keys(words[0]):
+            if key in _WORD_CATEGORIES:
+                return _WORD_CATEGORIES[key]
+        return None
+
+    def graph_name(self, name):
+        """Nazwa składnika z bazy pasująca do name albo None."""
+        graph_names = self._graph_names()
+        for key in name_keys(name):
+            if key in graph_names:
+                return graph_names[key]
+        return None
+
+    def lookup(self, name, known_only=False):
+        """
+        Nazwa i kategoria produktu. known_only=True przyjmuje tylko składniki z bazy - bez słownika
+        i zapamiętanych odpowiedzi, które mogą dotyczyć produktów niespożywczych.
+        """
+        graph_name = self.graph_name(name)
+        if known_only:
+            if graph_name is None:
+                return None
+            category = self.category_for(name, head_only=True)
+            return {"ingredient": graph_name, "category": category} if category else None
+        with self.lock:
+            entry = self.learned.get(self.key(name))
+        if entry is not None:
+            return dict(entry)
+        category = self.category_for(name, head_only=graph_name is not None)
+        if category is None:
+            return None
+        return {"ingredient": graph_name or normalize_text(name), "category": category}
+
+    def normalize(self, text, quantity=None, known_only=False):
+        name, parsed = split_ingredient(text)
+        entry = self.lookup(name, known_only=known_only)
+        if entry is None:
+            return None
+        if parsed is not None and parsed["amount"] is not None:
+            entry["quantity"] = _number(parsed["amount"])
+            entry["unit"] = parsed["unit"] or "szt"
+        else:
+            entry["quantity"] = quantity if quantity is not None else 1
+            entry["unit"] = "szt"
+        return entry
+
+    def learn(self, text, item):
+        """Zapamiętuje nazwę i kategorię produktu (np. z odpowiedzi LLM) dla kolejnych wywołań."""
+        if not item or not item.get("ingredient"):
+            return
+        name, _ = split_ingredient(text)
+        with self.lock:
+            self.learned[self.key(name)] = {
+                "ingredient": item["ingredient"],
+                "category": item.get("category") or "Inne",
+            }
+            self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.learned, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, self.path)
+
+
+_normalizer = None
+_normalizer_lock = threading.Lock()
+
+
+def _ingredient_names():
+    from recipe_data.recipe_data.tools.rag_tools import get_neo4j_graph
+
+    return [row["name"] for row in get_neo4j_graph(with_schema=False).query(INGREDIENT_NAMES_QUERY)]
+
+
+def get_ingredient_normalizer():
+    global _normalizer
+    with _normalizer_lock:
+        if _normalizer is None:
+            _normalizer = IngredientNormalizer(names_fn=_ingredient_names)
+        return _normalizer
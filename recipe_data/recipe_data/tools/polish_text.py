@@ -0,0 +1,40 @@
+import re
+import unicodedata
+
+# Najczęstsze końcówki fleksyjne - wystarczające do dopasowania "jajkami" do "jajka"
+# czy "mlekiem" do "mleko", bez pełnej lematyzacji.
+SUFFIXES = sorted(
+    ["ami", "ach", "ów", "om", "iem", "em", "ie", "ą", "ę", "y", "i", "a", "e", "o", "u"],
+    key=len, reverse=True,
+)
+MIN_STEM_LENGTH = 3
+# Do wyszukiwania podciągiem (toLower(nazwa) CONTAINS rdzeń) rdzeń może być krótszy: dopełniacz liczby mnogiej
+# "jajek", "jabłek", "ogórków" traci też "-ek"/"-ków", żeby pasować do "jajka", "jabłko", "ogórek".
+# stem() tego nie robi - jego klucze są porównywane dokładnie i zapisywane (categories.json).
+SEARCH_SUFFIXES = sorted(SUFFIXES + ["ek", "ków"], key=len, reverse=True)
+WORD_RE = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+
+def normalize_text(text):
+    text = unicodedata.normalize("NFC", text or "").lower()
+    return " ".join(WORD_RE.findall(text))
+
+
+def stem(word):
+    word = word.lower()
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM_LENGTH:
+            return word[:-len(suffix)]
+    return word
+
+
+def search_stem(word):
+    word = word.lower()
+    for suffix in SEARCH_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM_LENGTH:
+            return word[:-len(suffix)]
+    return word
+
+
+def stems(text):
+    return [stem(word) for word in normalize_text(text).split()]
@@ -9,6 +9,17 @@ conversion_prompt = ChatPromptTemplate.from_template("""{question}
     Dodatkowo do kluczy w odpowiedzi json użyj angielskich nazw: ingredient, category, quantity,
     """)
 
+summary_prompt = ChatPromptTemplate.from_template("""Streszczasz rozmowę użytkownika z asystentem kulinarnym.
+    Połącz dotychczasowe podsumowanie z nowymi wiadomościami w jedno krótkie podsumowanie (maksymalnie kilka zdań).
+    Zachowaj preferencje użytkownika, wybrane przepisy i ustalenia, pomiń pełne listy produktów.
+    Zwróć tylko podsumowanie, bez dodatkowego tekstu.
+
+    Dotychczasowe podsumowanie: {summary}
+
+    Nowe wiadomości:
+    {messages}
+    """)
+
 prompt = ChatPromptTemplate.from_messages([
     ("system", """Jesteś inteligentnym asystentem kulinarnym. Pomagasz użytkownikowi gotować, zarządzać lodówką i listą zakupów.
 
@@ -36,6 +47,7 @@ KLUCZOWE ZASADY ZACHOWANIA:
 4. PAMIĘĆ KONTEKSTU:
    - Pamiętaj co było wcześniej w rozmowie
    - Jeśli już sprawdziłeś lodówkę, nie pytaj ponownie - używaj tych danych
+   - Aktualny stan lodówki i podsumowanie starszej części rozmowy dostajesz w wiadomościach systemowych przed historią
    - Kontynuuj wątek rozmowy logicznie
 
 5. ROZRÓŻNIANIE LODÓWKI I LISTY ZAKUPÓW:
@@ -1,34 +1,97 @@
 import os
+import threading
+import time
 from langchain_core.tools import Tool
-from langchain_neo4j import GraphCypherQAChain, Neo4jGraph, Neo4jVector
-from langchain_openai import AzureOpenAIEmbeddings
+from langchain_neo4j import GraphCypherQAChain, Neo4jGraph
+from recipe_data.recipe_data.embeddings import VECTOR_INDEX_EXISTS_QUERY, VECTOR_INDEX_NAME, get_embeddings
 from recipe_data.recipe_data.tools.common import llm
+from recipe_data.recipe_data.tools.cypher_router import covers_terms, format_results, route_question
 from recipe_data.recipe_data.tools.prompts import CYPHER_PROMPT, QA_PROMPT
+from recipe_data.recipe_data.tools.response_cache import GRAPH_VERSION_QUERY
 
-def get_neo4j_graph():
-    graph = Neo4jGraph(
-        url="bolt://localhost:7687",
-        username="neo4j",
-        password=os.getenv("NEO4J_PASSWORD", "DATABASE_PASSWORD")
+VECTOR_SEARCH_QUERY = """
+CALL db.index.vector.queryNodes($index_name, $k, $vector) YIELD node, score
+RETURN node.title AS title, node.slug AS slug, node.url AS url, score
+"""
+
+# Jeden Neo4jGraph (z pulą połączeń sterownika) na cały proces - współdzielony przez
+# narzędzia, instancje chatbota i kolejne reruny Streamlita.
+SCHEMA_TTL_SECONDS = 300
+_graph = None
+_schema_refreshed_at = None
+# Rośnie przy każdym odświeżeniu schematu - obiekty zbudowane na starym schemacie wiedzą, że trzeba je przebudować
+_schema_generation = 0
+_graph_lock = threading.Lock()
+
+def _schema_stale():
+    return _schema_refreshed_at is None or time.monotonic() - _schema_refreshed_at > SCHEMA_TTL_SECONDS
+
+def get_neo4j_graph(with_schema=True, refresh_schema=False):
+    global _graph, _schema_refreshed_at, _schema_generation
+    with _graph_lock:
+        if _graph is None:
+            _graph = Neo4jGraph(
+                url=os.getenv("NEO4J_URI", "bolt://localhost:7687"),
+                username="neo4j",
+                password=os.getenv("NEO4J_PASSWORD", "DATABASE_PASSWORD"),
+                refresh_schema=False
+            )
+        if refresh_schema or (with_schema and _schema_stale()):
+            _graph.refresh_schema()
+            _schema_refreshed_at = time.monotonic()
+            _schema_generation += 1
+    return _graph
+
+def get_schema_generation():
+    """Numer bieżącego schematu; po SCHEMA_TTL_SECONDS (lub invalidate_schema()) schemat jest najpierw odświeżany."""
+    if _schema_stale():
+        get_neo4j_graph()
+    return _schema_generation
+
+def invalidate_schema():
+    global _schema_refreshed_at
+    with _graph_lock:
+        _schema_refreshed_at = None
+
+def get_graph_version():
+    result = get_neo4j_graph(with_schema=False).query(GRAPH_VERSION_QUERY)
+    return result[0]["version"] if result else None
+
+def _build_cypher_chain(graph):
+    return GraphCypherQAChain.from_llm(
+        llm, 
+        graph=graph, 
+        verbose=True, 
+        allow_dangerous_requests=True,
+        cypher_prompt=CYPHER_PROMPT,
+        qa_prompt=QA_PROMPT
     )
-    graph.refresh_schema()
-    return graph
 
 def get_graph_rag_tool():
     try:
         graph = get_neo4j_graph()
         print(f"Neo4j Schema: {graph.schema}")
-        chain = GraphCypherQAChain.from_llm(
-            llm, 
-            graph=graph, 
-            verbose=True, 
-            allow_dangerous_requests=True,
-            cypher_prompt=CYPHER_PROMPT,
-            qa_prompt=QA_PROMPT
-        )
+        # Łańcuch zapamiętuje schemat z chwili budowy - po odświeżeniu schematu jest budowany od nowa
+        built = {"chain": _build_cypher_chain(graph), "generation": get_schema_generation()}
+
+        def get_chain():
+            generation = get_schema_generation()
+            if generation != built["generation"]:
+                built["chain"], built["generation"] = _build_cypher_chain(get_neo4j_graph()), generation
+            return built["chain"]
+
+        def answer(question):
+            # Typowe pytania (okazja / składniki) idą gotowym zapytaniem, bez dwóch wywołań LLM
+            routed = route_question(question)
+            if routed:
+                results = graph.query(*routed)
+                if results and covers_terms(routed[1], results):
+                    return format_results(results)
+            return get_chain().run(question)
+
         return Tool(
             name="GraphRAG",
-            func=chain.run,
+            func=answer,
             description="""OBOWIĄZKOWE narzędzie do wyszukiwania przepisów! Użyj ZAWSZE gdy użytkownik pyta o:
 - przepisy na śniadanie/obiad/kolację
 - co ugotować ze składników
@@ -40,29 +103,33 @@ Przekaż pytanie w języku naturalnym, np. 'przepisy na śniadanie z jajkami i m
         print(f"Failed to initialize GraphRAG: {e}")
         return None
 
-def get_vector_rag_tool():
-    api_key = os.getenv("AZURE_EMBEDDING_API_KEY")
-    api_version = os.getenv("AZURE_EMBEDDING_API_VERSIONS")
-    azure_endpoint = os.getenv("AZURE_EMBEDDING_ENDPOINT")
-    model = os.getenv("AZURE_EMBEDDING_MODEL")
-
-    embeddings = AzureOpenAIEmbeddings(api_key=api_key, api_version=api_version, model=model, 
-                                       azure_endpoint=azure_endpoint) 
-    
-    vector_index = Neo4jVector.from_existing_graph(
-        embeddings,
-        url="bolt://localhost:7687",
-        username="neo4j",
-        password=os.getenv("NEO4J_PASSWORD", "DATABASE_PASSWORD"),
-        index_name="recipes_vector",
-        node_label="Recipe",
-        text_node_properties=["title", "slug", "url"],
-        embedding_node_property="embedding",
-    )
-    
+def get_vector_rag_tool(backend=None):
+    # Embeddingi liczy osobne zadanie (python -m recipe_data.embeddings albo EMBED_ON_CLOSE
+    # w scraperze), tutaj tylko podpinamy się pod istniejący indeks wektorowy.
+    # backend="local" szuka w macierzy wyeksportowanej przez: python -m recipe_data.local_vectors export
+    backend = backend or os.getenv("VECTOR_BACKEND", "neo4j")
+    try:
+        if backend == "local":
+            from recipe_data.recipe_data.local_vectors import DEFAULT_VECTOR_DIR, LocalVectorIndex
+
+            local_index = LocalVectorIndex(os.getenv("LOCAL_VECTOR_DIR", DEFAULT_VECTOR_DIR))
+        else:
+            graph = get_neo4j_graph(with_schema=False)
+            if not graph.query(VECTOR_INDEX_EXISTS_QUERY, {"name": VECTOR_INDEX_NAME}):
+                print(f"Vector index '{VECTOR_INDEX_NAME}' not found - run: python -m recipe_data.embeddings")
+                return None
+        embeddings = get_embeddings()
+    except Exception as e:
+        print(f"Failed to initialize VectorRAG: {e}")
+        return None
+
     def search(query):
-        results = vector_index.similarity_search(query)
-        return "\n".join([doc.page_content for doc in results])
+        vector = embeddings.embed_query(query)
+        if backend == "local":
+            results = local_index.search(vector, k=4)
+        else:
+            results = graph.query(VECTOR_SEARCH_QUERY, {"index_name": VECTOR_INDEX_NAME, "k": 4, "vector": vector})
+        return "\n".join([f"\ntitle: {r['title']}\nslug: {r['slug']}\nurl: {r['url']}" for r in results])
 
     return Tool(
         name="VectorRAG",
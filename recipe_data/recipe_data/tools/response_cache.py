@@ -0,0 +1,200 @@
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from langchain_core.tools import Tool
+
+from recipe_data.recipe_data.tools.polish_text import normalize_text
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "response_cache.json")
+
+# Najnowszy zapis przepisu - zmienia się przy każdym ponownym zasileniu bazy
+GRAPH_VERSION_QUERY = """
+MATCH (r:Recipe) WHERE r.last_updated IS NOT NULL
+RETURN toString(r.last_updated) AS version
+ORDER BY r.last_updated DESC LIMIT 1
+"""
+
+# Wszystkie instancje, bez przedłużania ich życia - przy zamknięciu procesu zapisujemy oczekujące wpisy
+_caches = weakref.WeakSet()
+
+
+@atexit.register
+def flush_all():
+    for cache in list(_caches):
+        cache.flush()
+
+
+class ResponseCache:
+    """
+    Cache odpowiedzi narzędzi RAG: LRU + TTL, opcjonalnie z dopasowaniem po embeddingach.
+    Nowe wpisy trafiają na dysk najwyżej raz na save_delay_seconds (i przy zamknięciu procesu),
+    a nie przy każdym put() - plik zawiera wektory i rośnie z liczbą wpisów.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=256, ttl_seconds=24 * 3600,
+                 embeddings=None, similarity_threshold=None, version_check_seconds=60, save_delay_seconds=5):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+        self.version_check_seconds = version_check_seconds
+        self.save_delay_seconds = save_delay_seconds
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.graph_version = None
+        self.version_checked_at = None
+        self.dirty = False
+        self.save_timer = None
+        self.load()
+        _caches.add(self)
+
+    def load(self):
+        if not os.path.isfile(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.graph_version = data.get("graph_version")
+        self.entries = OrderedDict((entry["key"], entry) for entry in data.get("entries", []))
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"graph_version": self.graph_version, "entries": list(self.entries.values())}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    def _schedule_save(self):
+        # Wywoływane pod self.lock; kolejne put() przed upływem opóźnienia dołączają do tego samego zapisu
+        self.dirty = True
+        if self.save_timer is None:
+            self.save_timer = threading.Timer(self.save_delay_seconds, self._flush_from_timer, args=(weakref.ref(self),))
+            self.save_timer.daemon = True
+            self.save_timer.start()
+
+    @staticmethod
+    def _flush_from_timer(cache_ref):
+        # Timer trzyma tylko słabą referencję, więc nieużywany cache może zostać zwolniony
+        cache = cache_ref()
+        if cache is not None:
+            cache.flush()
+
+    def flush(self):
+        with self.lock:
+            if self.save_timer is not None:
+                self.save_timer.cancel()
+                self.save_timer = None
+            if self.dirty:
+                self.save()
+
+    @staticmethod
+    def make_key(tool_name, query, context):
+        return f"{tool_name}|{context}|{normalize_text(query)}"
+
+    def check_graph_version(self, version_fn):
+        # Nie pytamy bazy przy każdym wywołaniu - wystarczy raz na version_check_seconds
+        now = time.monotonic()
+        if self.version_checked_at is not None and now - self.version_checked_at < self.version_check_seconds:
+            return
+        self.version_checked_at = now
+        version = version_fn()
+        with self.lock:
+            if version != self.graph_version:
+                self.entries.clear()
+                self.graph_version = version
+                self.save()
+
+    def _expired(self, entry):
+        return time.time() - entry["created"] > self.ttl_seconds
+
+    def _similar(self, tool_name, context, vector):
+        best, best_score = None, self.similarity_threshold
+        for entry in self.entries.values():
+            if entry["tool"] != tool_name or entry["context"] != context or not entry.get("vector"):
+                continue
+            score = sum(a * b for a, b in zip(vector, entry["vector"]))
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    def get(self, tool_name, query, context):
+        key = self.make_key(tool_name, query, context)
+        vector = None
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is None and self.embeddings is not None and self.similarity_threshold:
+            vector = self.embeddings.embed_query(normalize_text(query))
+            with self.lock:
+                entry = self._similar(tool_name, context, vector)
+        if entry is None or self._expired(entry):
+            return None, vector
+        with self.lock:
+            if entry["key"] in self.entries:
+                self.entries.move_to_end(entry["key"])
+        return entry["answer"], vector
+
+    def put(self, tool_name, query, context, answer, vector=None):
+        key = self.make_key(tool_name, query, context)
+        with self.lock:
+            self.entries[key] = {
+                "key": key, "tool": tool_name, "context": context, "query": query,
+                "answer": answer, "created": time.time(), "vector": vector,
+            }
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self._schedule_save()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.save()
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    # Jeden cache na proces; RESPONSE_CACHE_SIMILARITY (np. 0.95) włącza dopasowanie po embeddingach
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            threshold = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0") or 0)
+            embeddings = None
+            if threshold:
+                from recipe_data.recipe_data.embeddings import get_embeddings
+
+                embeddings = get_embeddings()
+            _shared_cache = ResponseCache(embeddings=embeddings, similarity_threshold=threshold or None)
+    return _shared_cache
+
+
+def fridge_fingerprint(fridge_content):
+    names = sorted({item.get("ingredient", "").strip().lower() for item in fridge_content or []})
+    return hashlib.sha1("|".join(names).encode("utf-8")).hexdigest()[:16]
+
+
+def cached_tool(tool, cache, context_fn, version_fn=None):
+    """Opakowuje narzędzie tak, żeby powtarzające się pytania (przy tej samej lodówce) wracały z cache."""
+    def run(query):
+        if version_fn is not None:
+            try:
+                cache.check_graph_version(version_fn)
+            except Exception as e:
+                print(f"Response cache: graph version check failed: {e}")
+        context = context_fn()
+        answer, vector = cache.get(tool.name, query, context)
+        if answer is None:
+            answer = tool.func(query)
+            cache.put(tool.name, query, context, answer, vector)
+        return answer
+
+    return Tool(name=tool.name, func=run, description=tool.description)
@@ -1,8 +1,67 @@
 import json
+import re
 from langchain_core.tools import tool
-from recipe_data.recipe_data.tools.common import llm, shopping_list, fridge
+from recipe_data.recipe_data.tools.common import llm, get_shopping_list, get_fridge
 from recipe_data.recipe_data.tools.prompts import conversion_prompt
 from recipe_data.recipe_data.tools.rag_tools import get_neo4j_graph
+from recipe_data.recipe_data.reader.photo_reader import get_item_cache, normalize_line, parse_json
+from recipe_data.recipe_data.tools.ingredient_normalizer import get_ingredient_normalizer
+from recipe_data.recipe_data.quantities import parse_quantity, parse_unit, to_base
+
+# Brakujące składniki przepisu liczone w bazie: produkt, którego nie ma w lodówce, trafia na listę
+# w całości, a taki, który jest w porównywalnej jednostce (g/ml/szt), tylko w brakującej ilości.
+MISSING_INGREDIENTS_QUERY = """
+MATCH (r:Recipe)
+WHERE r.title =~ $title
+WITH r ORDER BY size(r.title) LIMIT 1
+OPTIONAL MATCH (r)-[rel:CONTAINS]->(i:Ingredient)
+WITH r, rel, i, [f IN $fridge WHERE f.name = toLower(i.name)] AS owned
+WITH r, rel, i, owned,
+     reduce(have = 0.0, f IN owned | have + CASE WHEN f.base_unit = rel.base_unit THEN f.base_amount ELSE 0.0 END) AS have
+RETURN r.title AS title,
+       collect(CASE
+           WHEN i IS NULL THEN null
+           WHEN size(owned) = 0 THEN {ingredient: i.name, quantity: coalesce(rel.amount, 1), unit: coalesce(rel.unit, 'szt')}
+           WHEN have > 0 AND rel.base_amount > have THEN {ingredient: i.name, quantity: rel.base_amount - have, unit: rel.base_unit}
+       END) AS missing
+"""
+
+
+def _fridge_quantities():
+    # Ilość zapisana tekstem ("1/2", "pół") przechodzi przez parser; nieczytelna jest nieznana (produkt liczy się jako obecny)
+    fridge_quantities = []
+    for item in get_fridge().refresh():
+        unit = parse_unit(item.get("unit")) or item.get("unit")
+        quantity = item.get("quantity")
+        amount = quantity if isinstance(quantity, (int, float)) else parse_quantity(str(quantity or "")).get("amount")
+        base_amount, base_unit = to_base(amount, unit)
+        fridge_quantities.append({
+            "name": str(item.get("ingredient", "")).strip().lower(),
+            "base_amount": base_amount,
+            "base_unit": base_unit,
+        })
+    return fridge_quantities
+
+
+def find_missing_ingredients(recipe_title):
+    """Zwraca (tytuł przepisu, brakujące składniki z ilościami) albo (None, []) gdy nie ma takiego przepisu."""
+    graph = get_neo4j_graph(with_schema=False)
+    result = graph.query(MISSING_INGREDIENTS_QUERY, {
+        "title": f"(?i).*{re.escape(recipe_title)}.*",
+        "fridge": _fridge_quantities(),
+    })
+    if not result:
+        return None, []
+    missing = [
+        dict(item, quantity=int(item["quantity"]) if float(item["quantity"]).is_integer() else round(item["quantity"], 2))
+        for item in result[0]["missing"]
+    ]
+    return result[0]["title"], missing
+
+
+def describe_missing(missing):
+    return ", ".join(f"{item['ingredient']} ({item['quantity']} {item['unit']})" for item in missing)
+
 
 @tool
 def read_shopping_list() -> str:
@@ -14,7 +73,7 @@ def read_shopping_list() -> str:
     Returns:
         JSON z listą produktów do kupienia.
     """
-    return json.dumps(shopping_list.content, ensure_ascii=False)
+    return json.dumps(get_shopping_list().refresh(), ensure_ascii=False)
 
 @tool
 def add_ingredient_to_shopping_list(ingredient_to_add: str, quantity: int):
@@ -27,9 +86,27 @@ def add_ingredient_to_shopping_list(ingredient_to_add: str, quantity: int):
         ingredient_to_add: nazwa składnika do dodania na listę zakupów.
         quantity: ilość do kupienia (domyślnie 1 jeśli nie podano).
     """
-    function_response = llm.invoke(conversion_prompt.format(question=f"{ingredient_to_add, quantity}"))
-    data = json.loads(function_response.content.replace("`", "").replace("\n", "").replace("json", "").strip(), strict=False)
-    shopping_list.add_to_content(data)
+    # Najpierw ten sam cache co przy zdjęciach list zakupów, potem słownik produktów; LLM tylko dla nowych,
+    # a jego odpowiedź trafia do obu
+    item_cache = get_item_cache()
+    key = normalize_line(ingredient_to_add)
+    cached = item_cache.get(key)
+    normalizer = get_ingredient_normalizer()
+    if cached:
+        data = dict(cached, quantity=quantity)
+    else:
+        data = normalizer.normalize(ingredient_to_add, quantity)
+    if data is None:
+        function_response = llm.invoke(conversion_prompt.format(question=f"{ingredient_to_add, quantity}"))
+        answer = parse_json(function_response.content)
+        if isinstance(answer, dict) and answer.get("ingredient"):
+            item_cache.put(key, answer)
+            normalizer.learn(ingredient_to_add, answer)
+            data = normalizer.normalize(ingredient_to_add, quantity) or dict(answer, quantity=quantity)
+        else:
+            # Nieoczekiwana odpowiedź modelu - produkt trafia na listę pod podaną nazwą, bez zapamiętywania
+            data = {"ingredient": ingredient_to_add, "category": "Inne", "quantity": quantity, "unit": "szt"}
+    get_shopping_list().add_to_content(data)
     return "Dodano do listy zakupów"
 
 @tool
@@ -42,47 +119,21 @@ def add_missing_ingredients_for_recipe(recipe_title: str):
         recipe_title: Tytuł przepisu, dla którego mają zostać dodane składniki.
     """
     try:
-        graph = get_neo4j_graph()
-        
-      
-        query = """
-        MATCH (r:Recipe)-[:CONTAINS]->(i:Ingredient)
-        WHERE r.title =~ $title
-        RETURN r.title as title, collect(i.name) as ingredients
-        """
-      
-        result = graph.query(query, {"title": f"(?i).*{recipe_title}.*"})
-        
-        if not result:
+        found_title, missing_items = find_missing_ingredients(recipe_title)
+
+        if found_title is None:
             return f"Nie znaleziono przepisu pasującego do nazwy: {recipe_title}"
-        
-     
-        found_title = result[0]['title']
-        recipe_ingredients = result[0]['ingredients']
-        
-        current_fridge = fridge.content 
-        if not current_fridge:
-            current_fridge = []
-            
-        fridge_items = {item.get('ingredient', '').lower() for item in current_fridge}
-        
-        missing_items = []
-        for ing in recipe_ingredients:
-            if ing.lower() not in fridge_items:
-                missing_items.append(ing)
-        
+
         if not missing_items:
             return f"Masz wszystkie składniki na {found_title}!"
             
         # Dodaj brakujące do listy zakupów
-        for item in missing_items:
-            shopping_list.add_to_content({
-                "ingredient": item,
-                "quantity": 1,
-                "category": "Brakujące do: " + found_title
-            })
+        get_shopping_list().add_many([
+            dict(item, category="Brakujące do: " + found_title)
+            for item in missing_items
+        ])
             
-        return f"Dodano do listy zakupów {len(missing_items)} brakujących składników na {found_title}: {', '.join(missing_items)}"
+        return f"Dodano do listy zakupów {len(missing_items)} brakujących składników na {found_title}: {describe_missing(missing_items)}"
         
     except Exception as e:
         return f"Błąd podczas przetwarzania: {e}"
@@ -97,35 +148,11 @@ def create_shopping_list_file_for_recipe(recipe_title: str):
         recipe_title: Tytuł przepisu, dla którego ma zostać wygenerowana lista.
     """
     try:
-        graph = get_neo4j_graph()
-        
-        query = """
-        MATCH (r:Recipe)-[:CONTAINS]->(i:Ingredient)
-        WHERE r.title =~ $title
-        RETURN r.title as title, collect(i.name) as ingredients
-        """
-      
-        result = graph.query(query, {"title": f"(?i).*{recipe_title}.*"})
-        
-        if not result:
+        found_title, missing_items = find_missing_ingredients(recipe_title)
+
+        if found_title is None:
             return f"Nie znaleziono przepisu pasującego do nazwy: {recipe_title}"
-        
-       
-        found_title = result[0]['title']
-        recipe_ingredients = result[0]['ingredients']
-        
 
-        current_fridge = fridge.content 
-        if not current_fridge:
-            current_fridge = []
-            
-        fridge_items = {item.get('ingredient', '').lower() for item in current_fridge}
-        
-        missing_items = []
-        for ing in recipe_ingredients:
-            if ing.lower() not in fridge_items:
-                missing_items.append(ing)
-        
         if not missing_items:
             return f"Masz wszystkie składniki na {found_title}! Nie trzeba tworzyć listy."
             
@@ -135,7 +162,7 @@ def create_shopping_list_file_for_recipe(recipe_title: str):
             f.write(f"Lista zakupów dla przepisu: {found_title}\n")
             f.write("="*30 + "\n")
             for item in missing_items:
-                f.write(f"- [ ] {item}\n")
+                f.write(f"- [ ] {item['ingredient']} ({item['quantity']} {item['unit']})\n")
             
         return f"Stworzono plik z listą zakupów: {filename}. Zawiera {len(missing_items)} brakujących składników."
         
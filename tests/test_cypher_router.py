@@ -0,0 +1,40 @@
+import pytest
+
+from recipe_data.recipe_data.tools.cypher_router import covers_terms, route_question
+
+
+@pytest.mark.parametrize("question, params", [
+    ("zupa z dyni", {"terms": [["dyn"]], "limit": 10, "dish": "zup"}),
+    ("ciasto z jabłkami", {"terms": [["jabłk"]], "limit": 10, "dish": "ciast"}),
+    ("Co mogę zrobić z jajek i mleka?", {"terms": [["jaj"], ["mlek"]], "limit": 10}),
+    ("z jajek i mleka", {"terms": [["jaj"], ["mlek"]], "limit": 10}),
+    ("przepisy z ogórków", {"terms": [["ogór"]], "limit": 10}),
+    ("przepisy na śniadanie z jajkami i mlekiem", {"terms": [["jajk"], ["mlek"]], "limit": 10, "occasion": "śniadani"}),
+    ("mam jajka, mleko", {"terms": [["jajk"], ["mlek"]], "limit": 10}),
+    ("coś na obiad", {"occasion": "obiad", "limit": 10}),
+    ("szybka zupa z dyni", None),
+    ("kremowa zupa z dyni", None),
+    ("Jakie dania bez mięsa?", None),
+    ("Opowiedz o kuchni włoskiej", None),
+])
+def test_route_question(question, params):
+    routed = route_question(question)
+    if params is None:
+        assert routed is None
+    else:
+        assert routed is not None
+        assert routed[1] == params
+
+
+def test_route_question_adds_dish_filter():
+    query, _ = route_question("zupa z dyni")
+    assert "$dish" in query
+    query, _ = route_question("przepisy z kurczakiem")
+    assert "$dish" not in query
+
+
+def test_covers_terms():
+    params = {"terms": [["jaj"], ["mlek"]]}
+    assert covers_terms(params, [{"matched_terms": [["jaj"]]}, {"matched_terms": [["mlek"]]}])
+    assert not covers_terms(params, [{"matched_terms": [["mlek"]]}])
+    assert covers_terms({"occasion": "obiad"}, [{"title": "Zupa"}])
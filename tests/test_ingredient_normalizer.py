@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from recipe_data.recipe_data.tools.ingredient_normalizer import IngredientNormalizer
+
+
+@pytest.fixture
+def normalizer(tmp_path):
+    return IngredientNormalizer(
+        path=str(tmp_path / "categories.json"),
+        names_fn=lambda: ["cukier", "mleko", "jajka", "papryka czerwona"],
+    )
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("2 łyżki cukru", {"ingredient": "cukier", "category": "Produkty sypkie", "quantity": 2, "unit": "łyżka"}),
+    ("mleko 1 l", {"ingredient": "mleko", "category": "Nabiał", "quantity": 1, "unit": "l"}),
+    ("3 jajka", {"ingredient": "jajka", "category": "Nabiał", "quantity": 3, "unit": "szt"}),
+    ("mlekiem", {"ingredient": "mleko", "category": "Nabiał", "quantity": 1, "unit": "szt"}),
+    ("ogórki", {"ingredient": "ogórki", "category": "Warzywa", "quantity": 1, "unit": "szt"}),
+])
+def test_normalize_matches_stems(normalizer, text, expected):
+    assert normalizer.normalize(text) == expected
+
+
+@pytest.mark.parametrize("text, category", [
+    ("mleko kokosowe", "Napoje"),
+    ("bułka tarta", "Produkty sypkie"),
+    ("liść laurowy", "Przyprawy"),
+])
+def test_category_phrases(text, category):
+    assert IngredientNormalizer.category_for(text) == category
+
+
+@pytest.mark.parametrize("text", [
+    "serwetki", "proszek do prania", "sól do zmywarki", "olej silnikowy", "woda toaletowa", "kawałek", "wodorosty",
+])
+def test_non_food_is_not_categorized(normalizer, text):
+    assert IngredientNormalizer.category_for(text) is None
+    assert normalizer.normalize(text) is None
+
+
+def test_known_only_requires_graph_ingredient(normalizer):
+    assert normalizer.normalize("papryka czerwona 2 szt", known_only=True)["ingredient"] == "papryka czerwona"
+    assert normalizer.normalize("ogórki", known_only=True) is None
+
+
+def test_quantity_argument_used_without_amount_in_text(normalizer):
+    assert normalizer.normalize("cukier", quantity=5)["quantity"] == 5
+
+
+def test_learn_persists_entries(tmp_path, normalizer):
+    assert normalizer.normalize("2 opakowania tofu") is None
+    normalizer.learn("2 opakowania tofu", {"ingredient": "tofu", "category": "Inne", "quantity": 2})
+
+    with open(tmp_path / "categories.json", encoding="utf-8") as f:
+        assert json.load(f) == {IngredientNormalizer.key("tofu"): {"ingredient": "tofu", "category": "Inne"}}
+    reloaded = IngredientNormalizer(path=str(tmp_path / "categories.json"))
+    assert reloaded.normalize("tofu 1 opak") == {"ingredient": "tofu", "category": "Inne", "quantity": 1, "unit": "opak."}
+
+
+@pytest.mark.parametrize("item", [None, {}, {"category": "Inne"}])
+def test_learn_ignores_answers_without_ingredient(tmp_path, normalizer, item):
+    normalizer.learn("tofu", item)
+    assert not (tmp_path / "categories.json").exists()
@@ -0,0 +1,85 @@
+import json
+import os
+
+import pytest
+
+from recipe_data.recipe_data.list_blueprint.list_blueprint import ListBlueprint
+
+
+MILK = {"ingredient": "mleko", "quantity": 1, "unit": "l", "category": "Nabiał"}
+EGGS = {"ingredient": "jajka", "quantity": 2, "unit": "szt", "category": "Nabiał"}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "fridge.json")
+
+
+def quantities(blueprint):
+    return {item["ingredient"]: item["quantity"] for item in blueprint.content}
+
+
+def test_log_is_replayed_on_load(path):
+    blueprint = ListBlueprint(path, op_log=True)
+    blueprint.add_to_content(MILK)
+    blueprint.add_to_content(MILK)
+    blueprint.add_to_content(EGGS)
+    blueprint.remove_from_content(dict(EGGS, quantity=1))
+
+    with open(path) as f:
+        assert json.load(f) == []
+    assert quantities(ListBlueprint(path, op_log=True)) == {"mleko": 2, "jajka": 1}
+
+
+def test_interrupted_compaction_does_not_replay_log_twice(path, monkeypatch):
+    blueprint = ListBlueprint(path, op_log=True)
+    blueprint.add_to_content(MILK)
+    blueprint.add_to_content(EGGS)
+
+    # Awaria po zapisie nowego pliku, przed usunięciem dziennika
+    def crash(_path):
+        raise RuntimeError("crash")
+
+    monkeypatch.setattr(os, "remove", crash)
+    with pytest.raises(RuntimeError):
+        blueprint.compact()
+    monkeypatch.undo()
+
+    assert os.path.isfile(f"{path}.log")
+    reloaded = ListBlueprint(path, op_log=True)
+    assert quantities(reloaded) == {"mleko": 1, "jajka": 2}
+
+    # Stary dziennik jest zastępowany przy kolejnym zapisie
+    reloaded.add_to_content(MILK)
+    assert quantities(ListBlueprint(path, op_log=True)) == {"mleko": 2, "jajka": 2}
+
+
+def test_truncated_last_log_line_is_skipped(path):
+    blueprint = ListBlueprint(path, op_log=True)
+    blueprint.add_to_content(MILK)
+    blueprint.add_to_content(EGGS)
+    with open(f"{path}.log", "rb+") as f:
+        f.seek(-10, os.SEEK_END)
+        f.truncate()
+
+    assert quantities(ListBlueprint(path, op_log=True)) == {"mleko": 1}
+
+
+def test_log_without_snapshot_header_is_replayed(path):
+    with open(path, "w") as f:
+        json.dump([MILK], f)
+    with open(f"{path}.log", "w", encoding="utf-8") as f:
+        f.write(json.dumps({"op": "add", "item": MILK}) + "\n")
+        f.write(json.dumps({"op": "add", "item": EGGS}) + "\n")
+
+    assert quantities(ListBlueprint(path, op_log=True)) == {"mleko": 2, "jajka": 2}
+
+
+def test_compaction_rewrites_file_and_removes_log(path):
+    blueprint = ListBlueprint(path, op_log=True, compact_every=3)
+    for _ in range(3):
+        blueprint.add_to_content(MILK)
+
+    assert not os.path.isfile(f"{path}.log")
+    with open(path) as f:
+        assert [item["quantity"] for item in json.load(f)] == [3]
@@ -0,0 +1,55 @@
+import pytest
+
+from recipe_data.recipe_data.quantities import parse_quantity, split_ingredient
+
+
+@pytest.mark.parametrize("raw, amount, unit", [
+    ("2 łyżki", 2.0, "łyżka"),
+    ("200 g", 200.0, "g"),
+    ("1/2 łyżeczki", 0.5, "łyżeczka"),
+    ("1 / 2", 0.5, None),
+    ("1 1/2 szklanki", 1.5, "szklanka"),
+    ("1/2-1 łyżki", 1.0, "łyżka"),
+    ("½-1 szklanki", 1.0, "szklanka"),
+    ("1 ½ - 2 szklanki", 2.0, "szklanka"),
+    ("2-3 ząbki", 3.0, "ząbek"),
+    ("ok. 200 g", 200.0, "g"),
+    ("około 2 łyżek", 2.0, "łyżka"),
+    ("pół kostki", 0.5, "kostka"),
+    ("szczypta", 1.0, "szczypta"),
+])
+def test_parse_quantity(raw, amount, unit):
+    quantity = parse_quantity(raw)
+    assert quantity["amount"] == amount
+    assert quantity["unit"] == unit
+    assert quantity["raw"] == raw
+
+
+@pytest.mark.parametrize("raw", ["1/0", "do smaku", "", None])
+def test_parse_quantity_unknown_keeps_raw(raw):
+    quantity = parse_quantity(raw)
+    assert quantity["amount"] is None
+    assert quantity["base_amount"] is None
+    assert quantity["raw"] == (raw or "")
+
+
+def test_parse_quantity_base_units():
+    quantity = parse_quantity("1 ½ - 2 szklanki")
+    assert (quantity["base_amount"], quantity["base_unit"]) == (500.0, "ml")
+
+
+@pytest.mark.parametrize("text, name, amount, unit", [
+    ("2 łyżki cukru", "cukru", 2.0, "łyżka"),
+    ("cukier 200 g", "cukier", 200.0, "g"),
+    ("ok. 200 g mąki", "mąki", 200.0, "g"),
+    ("1 / 2 szklanki mleka", "mleka", 0.5, "szklanka"),
+    ("2 jajka", "jajka", 2.0, None),
+])
+def test_split_ingredient(text, name, amount, unit):
+    parsed_name, quantity = split_ingredient(text)
+    assert parsed_name == name
+    assert (quantity["amount"], quantity["unit"]) == (amount, unit)
+
+
+def test_split_ingredient_without_quantity():
+    assert split_ingredient("mleko") == ("mleko", None)
@@ -0,0 +1,84 @@
+import gc
+import time
+import weakref
+
+import pytest
+
+from recipe_data.recipe_data.tools import response_cache
+from recipe_data.recipe_data.tools.response_cache import ResponseCache
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "response_cache.json")
+
+
+def count_saves(monkeypatch):
+    saves = []
+    original = ResponseCache.save
+
+    def save(self):
+        saves.append(len(self.entries))
+        original(self)
+
+    monkeypatch.setattr(ResponseCache, "save", save)
+    return saves
+
+
+def test_puts_within_delay_are_saved_once(path, monkeypatch):
+    saves = count_saves(monkeypatch)
+    cache = ResponseCache(path=path, save_delay_seconds=0.2)
+    for question in ["zupa", "ciasto", "sałatka", "pierogi", "naleśniki"]:
+        cache.put("GraphRAG", question, "ctx", f"odpowiedź: {question}")
+    assert saves == []
+
+    time.sleep(0.5)
+    assert saves == [5]
+    assert len(ResponseCache(path=path).entries) == 5
+
+
+def test_flush_writes_pending_entries(path, monkeypatch):
+    saves = count_saves(monkeypatch)
+    cache = ResponseCache(path=path, save_delay_seconds=60)
+    cache.put("GraphRAG", "zupa", "ctx", "odpowiedź")
+    response_cache.flush_all()
+    cache.flush()
+
+    assert saves == [1]
+    assert cache.save_timer is None
+    assert ResponseCache(path=path).get("GraphRAG", "zupa", "ctx")[0] == "odpowiedź"
+
+
+def test_lru_eviction(path):
+    cache = ResponseCache(path=path, max_entries=2, save_delay_seconds=60)
+    cache.put("GraphRAG", "zupa", "ctx", "a")
+    cache.put("GraphRAG", "ciasto", "ctx", "b")
+    assert cache.get("GraphRAG", "zupa", "ctx")[0] == "a"
+    cache.put("GraphRAG", "sałatka", "ctx", "c")
+
+    assert cache.get("GraphRAG", "ciasto", "ctx")[0] is None
+    assert cache.get("GraphRAG", "zupa", "ctx")[0] == "a"
+    assert cache.get("GraphRAG", "sałatka", "ctx")[0] == "c"
+    cache.flush()
+
+
+def test_ttl_expiry(path, monkeypatch):
+    cache = ResponseCache(path=path, ttl_seconds=60, save_delay_seconds=60)
+    now = time.time()
+    monkeypatch.setattr(response_cache.time, "time", lambda: now)
+    cache.put("GraphRAG", "zupa", "ctx", "a")
+    assert cache.get("GraphRAG", "zupa", "ctx")[0] == "a"
+
+    monkeypatch.setattr(response_cache.time, "time", lambda: now + 61)
+    assert cache.get("GraphRAG", "zupa", "ctx")[0] is None
+    cache.flush()
+
+
+def test_unused_cache_is_not_kept_alive(path):
+    cache = ResponseCache(path=path, save_delay_seconds=60)
+    cache.put("GraphRAG", "zupa", "ctx", "a")
+    cache.flush()
+    cache_ref = weakref.ref(cache)
+    del cache
+    gc.collect()
+    assert cache_ref() is None